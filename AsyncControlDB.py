@@ -0,0 +1,213 @@
+import asyncio
+import os
+import aiohttp
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob.aio import BlobServiceClient
+import ControlDB
+import Metrics
+
+
+class AsyncControlDB:
+    """
+    Variante assíncrona do ControlDB para quem grava muitos produtos de uma vez.
+
+    O Blob Storage é acessado pelo SDK assíncrono (aiohttp) e o SQL Server pelo
+    pool do ControlDB em threads (o pymssql é bloqueante). Cada produto envia
+    as imagens primeiro e só então ocupa uma conexão, por um INSERT/UPDATE
+    curto com commit imediato: nenhuma transação fica aberta durante o upload.
+    O ganho vem de processar muitos produtos ao mesmo tempo.
+
+    No máximo `concurrency` operações ficam em andamento ao mesmo tempo; os
+    comandos SQL são limitados ao tamanho do pool de conexões.
+    """
+
+    def __init__(self, db=None, concurrency=None):
+        self.db = db or ControlDB.ControlDB()
+        self.concurrency = concurrency or int(os.getenv("ASYNC_CONCURRENCY", "64"))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # Uma operação de banco por conexão do pool, para não prender threads esperando conexão
+        self._sql_slots = asyncio.Semaphore(self.db.pool.max_size)
+        self._session = None
+        self._container = None
+        self._uploads = {}  # nome do blob -> upload em andamento
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """
+        Fecha o cliente assíncrono do Blob Storage e sua sessão HTTP.
+        """
+        if self._container is not None:
+            await self._container.close()
+            await self._session.close()
+            self._container = self._session = None
+
+    def _container_client(self):
+        # Criado dentro do loop de eventos, na primeira operação com blobs
+        if self._container is None:
+            pool_size = int(os.getenv("BLOB_POOL_SIZE", "10"))
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size))
+            transport = AioHttpTransport(
+                session=self._session,
+                session_owner=False,
+                connection_timeout=float(os.getenv("BLOB_CONNECTION_TIMEOUT", "10")),
+                read_timeout=float(os.getenv("BLOB_READ_TIMEOUT", "60")),
+            )
+            service_client = BlobServiceClient.from_connection_string(self.db.blob_connection_string, transport=transport)
+            self._container = service_client.get_container_client(self.db.blob_container_name)
+        return self._container
+
+    async def _put_blobs(self, blobs):
+        """
+        Envia os blobs em paralelo, pulando os que já existem. Como em
+        ControlDB._put_blob, a existência é sempre consultada e envios
+        simultâneos do mesmo blob compartilham um único upload.
+        """
+        container = self._container_client()
+
+        async def put(blob_name, body):
+            blob_client = container.get_blob_client(blob_name)
+            with Metrics.timer("blob.exists"):
+                exists = await blob_client.exists()
+            if not exists:
+                with Metrics.timer("blob.upload"):
+                    await blob_client.upload_blob(body, overwrite=True)
+                Metrics.add_bytes("blob.upload", len(body))
+
+        async def put_once(blob_name, body):
+            upload = self._uploads.get(blob_name)
+            if upload is None:
+                upload = self._uploads[blob_name] = asyncio.ensure_future(put(blob_name, body))
+                upload.add_done_callback(lambda _: self._uploads.pop(blob_name, None))
+            await asyncio.shield(upload)
+
+        await asyncio.gather(*(put_once(name, body) for name, body in blobs.items()))
+
+    async def upload_image(self, image, image_name=None, blob_prefix=""):
+        """
+        Equivalente assíncrono de ControlDB.upload_image.
+        """
+        try:
+            blobs, image_url, thumbnails = await asyncio.to_thread(self.db.plan_image_upload, image, image_name, blob_prefix)
+            await self._put_blobs(blobs)
+            return image_url, thumbnails
+        except Exception as e:
+            print(f"Erro ao fazer upload do blob: {e}")
+            return None, None
+
+    def _execute(self, query, params):
+        # Executa o comando em uma conexão do pool e confirma na hora
+        with self.db.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            conn.commit()
+            cursor.close()
+
+    async def _write_with_upload(self, query, params, blobs):
+        """
+        Envia os blobs e, só depois que todos subiram, executa o comando. A
+        conexão fica ocupada apenas pelo comando e seu commit. Como em
+        ControlDB._holding_blobs, os blobs ficam reservados contra a fila de
+        exclusão até o commit.
+        """
+        names = list(blobs)
+        delete_queue = self.db._delete_queue() if names else None
+        if delete_queue:
+            await asyncio.to_thread(delete_queue.hold, names)
+        try:
+            await self._put_blobs(blobs)
+            async with self._sql_slots:
+                await asyncio.to_thread(self._execute, query, params)
+        finally:
+            if delete_queue:
+                delete_queue.release(names)
+        self.db.page_cache.invalidate()
+
+    async def save_product_to_db(self, name, price, description, image=None, image_name=None, image_urls=None):
+        """
+        Equivalente assíncrono de ControlDB.save_product_to_db.
+        """
+        async with self._semaphore:
+            try:
+                if image_urls:
+                    blobs, (image_url, thumbnails) = {}, image_urls
+                else:
+                    blobs, image_url, thumbnails = await asyncio.to_thread(self.db.plan_image_upload, image, image_name)
+                await self._write_with_upload(
+                    "INSERT INTO Produtos (nome, descricao, preco, imagem_url, imagem_thumbs) VALUES (%s, %s, %s, %s, %s)",
+                    (name, description, price, image_url, thumbnails),
+                    blobs,
+                )
+                return True
+            except Exception as e:
+                print(f"Erro ao salvar produto no banco de dados: {e}")
+                return False
+
+    async def update_product_in_db(self, product_id, name, price, description, image=None, image_name=None, image_urls=None):
+        """
+        Equivalente assíncrono de ControlDB.update_product_in_db.
+        """
+        async with self._semaphore:
+            try:
+                if not image and not image_urls:
+                    async with self._sql_slots:
+                        return await asyncio.to_thread(self.db.update_product_in_db, product_id, name, price, description)
+                if image_urls:
+                    blobs, (image_url, thumbnails) = {}, image_urls
+                else:
+                    blobs, image_url, thumbnails = await asyncio.to_thread(self.db.plan_image_upload, image, image_name)
+                await self._write_with_upload(
+                    """
+                    UPDATE Produtos
+                    SET nome = %s, descricao = %s, preco = %s, imagem_url = %s, imagem_thumbs = %s
+                    WHERE id = %s
+                    """,
+                    (name, description, price, image_url, thumbnails, product_id),
+                    blobs,
+                )
+                return True
+            except Exception as e:
+                print(f"Erro ao atualizar o produto no banco de dados: {e}")
+                return False
+
+    async def delete_products_from_db(self, product_ids):
+        """
+        Equivalente assíncrono de ControlDB.delete_products_from_db.
+        """
+        async with self._semaphore, self._sql_slots:
+            return await asyncio.to_thread(self.db.delete_products_from_db, product_ids)
+
+    async def delete_product_from_db(self, product_id):
+        return await self.delete_products_from_db([product_id]) is not None
+
+    async def list_products_from_db(self, page=1, page_size=10, after_id=None):
+        async with self._semaphore, self._sql_slots:
+            return await asyncio.to_thread(self.db.list_products_from_db, page, page_size, after_id)
+
+    async def search_products(self, **filters):
+        async with self._semaphore, self._sql_slots:
+            return await asyncio.to_thread(lambda: self.db.search_products(**filters))
+
+    async def save_many(self, products):
+        """
+        Salva todos os produtos (dicionários com os argumentos de
+        save_product_to_db) concorrentemente. Retorna um bool por produto.
+        """
+        return await asyncio.gather(*(self.save_product_to_db(**product) for product in products))
+
+
+def save_products(products, concurrency=None, db=None):
+    """
+    Fachada síncrona: salva os produtos concorrentemente com AsyncControlDB e
+    retorna um bool por produto. Para código síncrono como os scripts de
+    carga; o ProductApp continua usando o ControlDB.
+    """
+    async def run():
+        async with AsyncControlDB(db, concurrency) as async_db:
+            return await async_db.save_many(products)
+
+    return asyncio.run(run())
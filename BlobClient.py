@@ -0,0 +1,67 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+
+# Clientes compartilhados pelo processo, um por (connection string, container)
+_clients = {}
+_sessions = []
+_lock = threading.Lock()
+
+
+def _build_transport():
+    """
+    Cria o transporte HTTP com uma sessão própria, que mantém as conexões
+    (e sessões TLS) abertas entre uploads e deleções.
+    """
+    pool_size = int(os.getenv("BLOB_POOL_SIZE", "10"))
+    session = requests.Session()
+    # O pipeline do Azure já tem sua política de retry; desliga a do urllib3
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    _sessions.append(session)
+    return RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=float(os.getenv("BLOB_CONNECTION_TIMEOUT", "10")),
+        read_timeout=float(os.getenv("BLOB_READ_TIMEOUT", "60")),
+    )
+
+
+def get_container_client(connection_string, container_name):
+    """
+    Retorna o ContainerClient do processo para o container informado,
+    criando-o (junto com o BlobServiceClient) apenas na primeira chamada.
+    """
+    key = (connection_string, container_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            service_client = BlobServiceClient.from_connection_string(connection_string, transport=_build_transport())
+            client = service_client.get_container_client(container_name)
+            _clients[key] = client
+        return client
+
+
+def reset_clients():
+    """
+    Descarta os clientes compartilhados, fechando suas sessões HTTP.
+    Útil quando a configuração muda ou em testes.
+    """
+    with _lock:
+        sessions = list(_sessions)
+        _clients.clear()
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -0,0 +1,172 @@
+import heapq
+import itertools
+from collections import Counter
+import os
+import queue
+import threading
+import time
+from azure.core.exceptions import ResourceNotFoundError
+import BlobClient
+import Metrics
+
+
+class BlobDeleteQueue:
+    """
+    Fila de exclusão de blobs processada por uma thread em segundo plano.
+
+    Cada item é um conjunto de nomes de blobs (imagem e versões) e, opcionalmente,
+    uma função `still_used()` consultada logo antes de apagar: se a imagem voltou
+    a ser usada por algum produto, nada é apagado. Falhas são repetidas com
+    espera exponencial até `max_attempts` tentativas.
+
+    Um blob endereçado pelo conteúdo pode voltar a ser usado enquanto espera
+    na fila. Neste processo, quem grava um produto reserva os blobs com
+    hold() até o commit, e a fila não os apaga nesse intervalo. Para gravações
+    em outros processos, cada exclusão espera `delay` segundos antes de
+    consultar `still_used()`, tempo para que o produto que reaproveitou o
+    blob seja confirmado no banco.
+    """
+
+    def __init__(self, container_client, max_attempts=5, base_delay=1.0, delay=0.0):
+        self.container_client = container_client
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.delay = delay
+        self._queue = queue.Queue()
+        self._scheduled = []  # heap (instante, seq, nomes, still_used, tentativa); só a thread o usa
+        self._seq = itertools.count()
+        self._idle = threading.Condition()
+        self._unfinished = 0
+        self._held = Counter()  # nomes reservados por gravações em andamento
+        self._deleting = set()  # nomes sendo apagados agora
+
+        # Métricas da fila
+        self.deleted = 0
+        self.skipped = 0
+        self.retries = 0
+        self.failed = 0
+
+        self._thread = threading.Thread(target=self._run, name="blob-delete-queue", daemon=True)
+        self._thread.start()
+
+    def put(self, blob_names, still_used=None):
+        """
+        Agenda a exclusão dos blobs e retorna imediatamente.
+        """
+        if not blob_names:
+            return
+        with self._idle:
+            self._unfinished += 1
+        self._queue.put((time.monotonic() + self.delay, tuple(blob_names), still_used))
+
+    def hold(self, blob_names):
+        """
+        Reserva os blobs para um produto em gravação: até release(), a fila
+        não os apaga. Se algum deles estiver sendo apagado agora, espera a
+        exclusão terminar, para que o upload seguinte o envie de novo.
+        """
+        with self._idle:
+            self._idle.wait_for(lambda: self._deleting.isdisjoint(blob_names))
+            self._held.update(blob_names)
+
+    def release(self, blob_names):
+        """
+        Desfaz a reserva feita por hold().
+        """
+        with self._idle:
+            self._held.subtract(blob_names)
+            for name in blob_names:
+                if self._held[name] <= 0:
+                    del self._held[name]
+
+    def wait_idle(self, timeout=None):
+        """
+        Espera até que todos os itens tenham sido apagados ou descartados.
+        Retorna False se o tempo acabar antes.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def stats(self):
+        with self._idle:
+            pending = self._unfinished
+        return {
+            "pending": pending,
+            "deleted": self.deleted,
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+    def _run(self):
+        while True:
+            # Itens vencidos (exclusões e retentativas) vêm antes da fila: com
+            # itens novos chegando sem parar, eles nunca seriam atendidos
+            if self._scheduled and self._scheduled[0][0] <= time.monotonic():
+                _, _, names, still_used, attempt = heapq.heappop(self._scheduled)
+                self._process(names, still_used, attempt)
+                continue
+            timeout = max(0.0, self._scheduled[0][0] - time.monotonic()) if self._scheduled else None
+            try:
+                due, names, still_used = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            heapq.heappush(self._scheduled, (due, next(self._seq), names, still_used, 1))
+
+    def _process(self, names, still_used, attempt):
+        with self._idle:
+            # Blobs reservados por uma gravação em andamento estão em uso
+            held = any(name in self._held for name in names)
+            if not held:
+                self._deleting.update(names)
+        done = True
+        try:
+            if held or (still_used and still_used()):
+                self.skipped += len(names)
+            else:
+                for name in names:
+                    with Metrics.timer("blob.delete"):
+                        try:
+                            self.container_client.delete_blob(name)
+                        except ResourceNotFoundError:
+                            pass  # Já apagado: nada a fazer
+                    self.deleted += 1
+        except Exception as e:
+            if attempt < self.max_attempts:
+                self.retries += 1
+                delay = self.base_delay * 2 ** (attempt - 1)
+                heapq.heappush(self._scheduled, (time.monotonic() + delay, next(self._seq), names, still_used, attempt + 1))
+                done = False
+            else:
+                self.failed += len(names)
+                print(f"Erro ao deletar blobs {names}: {e}")
+        finally:
+            with self._idle:
+                self._deleting.difference_update(names)
+                if done:
+                    self._unfinished -= 1
+                self._idle.notify_all()
+
+
+# Filas compartilhadas pelo processo, uma por (connection string, container)
+_queues = {}
+_lock = threading.Lock()
+
+
+def get_delete_queue(connection_string, container_name):
+    """
+    Retorna a fila de exclusão do processo para o container informado,
+    criando-a na primeira chamada. Configurada por BLOB_DELETE_MAX_ATTEMPTS,
+    BLOB_DELETE_RETRY_DELAY e BLOB_DELETE_DELAY.
+    """
+    key = (connection_string, container_name)
+    with _lock:
+        delete_queue = _queues.get(key)
+        if delete_queue is None:
+            delete_queue = _queues[key] = BlobDeleteQueue(
+                BlobClient.get_container_client(connection_string, container_name),
+                max_attempts=int(os.getenv("BLOB_DELETE_MAX_ATTEMPTS", "5")),
+                base_delay=float(os.getenv("BLOB_DELETE_RETRY_DELAY", "1")),
+                delay=float(os.getenv("BLOB_DELETE_DELAY", "30")),
+            )
+        return delete_queue
@@ -0,0 +1,109 @@
+"""
+Importação de produtos em massa a partir de arquivos CSV ou JSONL.
+
+Cada registro deve ter os campos name, price, description e image (caminho
+de um arquivo local) ou image_url. O progresso é salvo em
+<arquivo>.checkpoint após cada lote gravado, então rodar o mesmo comando de
+novo retoma a importação de onde ela parou. Registros cuja imagem falhou
+vão para <arquivo>.errors.jsonl.
+
+Uso:
+    python BulkImport.py produtos.csv --batch-size 500 --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+from itertools import islice
+import ControlDB
+
+
+def read_products(path, skip=0):
+    """
+    Lê os produtos do arquivo sob demanda (sem carregar tudo na memória),
+    pulando os `skip` primeiros registros.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            records = (json.loads(line) for line in file if line.strip())
+        else:
+            records = csv.DictReader(file)
+        for record in islice(records, skip, None):
+            record["price"] = float(record["price"])
+            yield record
+
+
+def load_checkpoint(path):
+    # Número de registros já gravados em uma execução anterior
+    try:
+        with open(path, encoding="utf-8") as file:
+            return int(file.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def save_checkpoint(path, processed):
+    # Grava em um arquivo temporário e renomeia, para nunca deixar o checkpoint pela metade
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(str(processed))
+    os.replace(tmp_path, path)
+
+
+def format_stats(stats):
+    # Resumo com a vazão de cada etapa
+    upload_rate = stats["uploads"] / stats["upload_seconds"] if stats["upload_seconds"] else 0.0
+    insert_rate = stats["saved"] / stats["insert_seconds"] if stats["insert_seconds"] else 0.0
+    total_rate = stats["processed"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    return (
+        f"{stats['processed']} processados, {stats['saved']} salvos, {stats['failed']} com erro | "
+        f"upload: {upload_rate:.1f} imagens/s | insert: {insert_rate:.1f} linhas/s | "
+        f"total: {total_rate:.1f} registros/s"
+    )
+
+
+def import_products(db, path, batch_size=500, workers=8, restart=False):
+    """
+    Importa o arquivo usando ControlDB.bulk_save_products, retomando a partir
+    do checkpoint. Retorna as estatísticas da execução.
+    """
+    checkpoint_path = f"{path}.checkpoint"
+    errors_path = f"{path}.errors.jsonl"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    skip = load_checkpoint(checkpoint_path)
+    if skip:
+        print(f"Retomando a importação após {skip} registros.")
+
+    with open(errors_path, "a", encoding="utf-8") as errors:
+        def on_batch(processed, stats):
+            errors.flush()
+            save_checkpoint(checkpoint_path, skip + processed)
+            print(f"Lote {stats['batches']}: {format_stats(stats)}")
+
+        def on_error(product):
+            errors.write(json.dumps(product, ensure_ascii=False) + "\n")
+
+        return db.bulk_save_products(
+            read_products(path, skip),
+            batch_size=batch_size,
+            max_workers=workers,
+            on_batch=on_batch,
+            on_error=on_error,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa produtos em massa a partir de CSV ou JSONL.")
+    parser.add_argument("arquivo", help="Arquivo .csv ou .jsonl com os produtos")
+    parser.add_argument("--batch-size", type=int, default=500, help="Produtos por transação")
+    parser.add_argument("--workers", type=int, default=8, help="Uploads de imagem simultâneos")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e importa do início")
+    args = parser.parse_args(argv)
+
+    stats = import_products(ControlDB.ControlDB(), args.arquivo, args.batch_size, args.workers, args.restart)
+    print(f"Importação concluída em {stats['elapsed']:.1f}s: {format_stats(stats)}")
+
+
+if __name__ == "__main__":
+    main()
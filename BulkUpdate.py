@@ -0,0 +1,102 @@
+"""
+Atualização de produtos em massa, em uma única transação.
+
+Alterações por produto, a partir de um arquivo CSV ou JSONL com a coluna id
+e as colunas a mudar (name, description, price); campos vazios ou ausentes
+ficam como estão:
+    python BulkUpdate.py alterar alteracoes.csv
+
+Reajuste percentual de preço, filtrado por ids, início do nome e/ou faixa
+de preço (--all reajusta todos os produtos):
+    python BulkUpdate.py reajustar --percent 5 --name-prefix "Camiseta"
+    python BulkUpdate.py reajustar --percent -10 --ids 1,2,3
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+import ControlDB
+
+FIELDS = ("name", "description", "price")
+
+
+def read_changes(path):
+    """
+    Lê as alterações do arquivo, descartando os campos vazios.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in file if line.strip()]
+        else:
+            records = list(csv.DictReader(file))
+    changes = []
+    for record in records:
+        change = {"id": int(record["id"])}
+        for field in FIELDS:
+            if record.get(field) not in (None, ""):
+                change[field] = record[field]
+        if "price" in change:
+            change["price"] = float(change["price"])
+        changes.append(change)
+    return changes
+
+
+def update_from_file(db, path):
+    """
+    Aplica as alterações do arquivo. Retorna (produtos atualizados ou None,
+    alterações lidas, segundos).
+    """
+    changes = read_changes(path)
+    start = time.perf_counter()
+    updated = db.update_products(changes)
+    return updated, len(changes), time.perf_counter() - start
+
+
+def reprice(db, percent, ids=None, name_prefix=None, min_price=None, max_price=None):
+    """
+    Reajusta os preços. Retorna (produtos atualizados ou None, segundos).
+    """
+    start = time.perf_counter()
+    updated = db.reprice_products(percent, ids=ids, name_prefix=name_prefix, min_price=min_price, max_price=max_price)
+    return updated, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = commands.add_parser("alterar", help="Aplica as alterações de um arquivo CSV ou JSONL")
+    update_parser.add_argument("arquivo", help="Arquivo .csv ou .jsonl com id e os campos a mudar")
+
+    reprice_parser = commands.add_parser("reajustar", help="Reajusta preços em um percentual")
+    reprice_parser.add_argument("--percent", type=float, required=True, help="Percentual do reajuste (negativo para desconto)")
+    reprice_parser.add_argument("--ids", help="Ids separados por vírgula")
+    reprice_parser.add_argument("--name-prefix", help="Só produtos cujo nome começa com este texto")
+    reprice_parser.add_argument("--min-price", type=float, help="Só produtos com preço a partir deste valor")
+    reprice_parser.add_argument("--max-price", type=float, help="Só produtos com preço até este valor")
+    reprice_parser.add_argument("--all", action="store_true", help="Reajusta todos os produtos (sem filtros)")
+    args = parser.parse_args(argv)
+
+    db = ControlDB.ControlDB()
+    if args.command == "alterar":
+        updated, total, elapsed = update_from_file(db, args.arquivo)
+        summary = f"{updated} de {total} produtos atualizados"
+    else:
+        ids = [int(i) for i in args.ids.split(",") if i.strip()] if args.ids else None
+        if ids is None and args.name_prefix is None and args.min_price is None and args.max_price is None and not args.all:
+            parser.error("informe --ids, --name-prefix, --min-price ou --max-price, ou use --all")
+        if args.percent <= -100:
+            parser.error("--percent deve ser maior que -100")
+        updated, elapsed = reprice(db, args.percent, ids, args.name_prefix, args.min_price, args.max_price)
+        summary = f"{updated} produtos reajustados em {args.percent:+g}%"
+
+    if updated is None:
+        print(f"Atualização desfeita após {elapsed:.2f}s: nenhum produto foi alterado.")
+        return 1
+    print(f"{summary} em {elapsed:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """
+    Levantada quando nenhuma conexão fica disponível dentro do tempo limite.
+    """
+
+
+class ConnectionPool:
+    """
+    Pool de conexões limitado e thread-safe.
+
+    Mantém no máximo `max_size` conexões abertas (ociosas + em uso). Conexões
+    ociosas por mais de `max_idle` segundos são fechadas, e conexões que ficaram
+    paradas por mais de `health_check_interval` segundos passam por um
+    `SELECT 1` antes de serem entregues.
+    """
+
+    def __init__(self, connect, max_size=5, max_idle=300.0, timeout=10.0, health_check_interval=30.0):
+        if max_size < 1:
+            raise ValueError("max_size deve ser maior que zero")
+        self._connect = connect  # Função que abre uma nova conexão (ex.: pymssql.connect)
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # Pares (conexão, instante do último uso)
+        self._size = 0  # Conexões abertas: ociosas + em uso
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Métricas do pool
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.evicted = 0
+        self.discarded = 0
+
+    def acquire(self, timeout=None):
+        """
+        Retira uma conexão do pool, abrindo uma nova se houver espaço.
+        Bloqueia até `timeout` segundos quando o pool está cheio.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            conn = None
+            stale = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Pool de conexões fechado")
+                    stale.extend(self._pop_expired())
+                    if self._idle:
+                        conn, last_used = self._idle.pop()  # LIFO: a mais recente está "quente"
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        last_used = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"Nenhuma conexão disponível após {timeout:.1f}s")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            for old in stale:
+                self._close_quietly(old)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+                with self._cond:
+                    self.created += 1
+            elif time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+                # Conexão quebrada: descarta e tenta de novo
+                self._close_quietly(conn)
+                self._forget(discarded=True)
+                continue
+
+            with self._cond:
+                self.checkouts += 1
+                if waited:
+                    self.waits += 1
+                    self.wait_time += time.monotonic() - start
+            return conn
+
+    def release(self, conn, discard=False):
+        """
+        Devolve a conexão ao pool. Com `discard=True` a conexão é fechada.
+        """
+        with self._cond:
+            if not discard and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._close_quietly(conn)
+        self._forget(discarded=discard)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Empréstimo de uma conexão via `with`. Em caso de exceção a transação é
+        desfeita; se nem o rollback funcionar, a conexão é descartada.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                self.release(conn, discard=True)
+            else:
+                self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """
+        Fecha todas as conexões ociosas e impede novos empréstimos.
+        """
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """
+        Retorna um dicionário com as métricas do pool.
+        """
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "evicted": self.evicted,
+                "discarded": self.discarded,
+            }
+
+    def _pop_expired(self):
+        # Remove as conexões ociosas há mais de max_idle (chamado com o lock)
+        now = time.monotonic()
+        expired = []
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            expired.append(conn)
+        self._size -= len(expired)
+        self.evicted += len(expired)
+        if expired:
+            self._cond.notify(len(expired))
+        return expired
+
+    def _forget(self, discarded=False):
+        # Libera a vaga de uma conexão que não existe mais
+        with self._cond:
+            self._size -= 1
+            if discarded:
+                self.discarded += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -1,11 +1,48 @@
-from azure.storage.blob import BlobServiceClient
+import hashlib
+import json
 import os
 import pymssql
-import uuid
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from dotenv import load_dotenv
+from ConnectionPool import ConnectionPool
+from Product import Product, ProductPage
+from TTLCache import TTLCache
+import BlobClient
+import BlobDeleteQueue
+import Metrics
 
 class ControlDB:
-    def __init__(self):
+    # O SQL Server aceita no máximo 2100 parâmetros por comando (4 por produto)
+    INSERT_ROWS_PER_STATEMENT = 250
+    DELETE_IDS_PER_STATEMENT = 2000
+    UPDATE_IDS_PER_STATEMENT = 2000
+    # Quantos caracteres da descrição a listagem traz
+    DESCRIPTION_PREVIEW_LENGTH = 200
+    # Blobs com este prefixo (imagem padrão) são compartilhados por muitos produtos e nunca são apagados
+    PROTECTED_BLOB_PREFIX = "placeholder_"
+    # Ordenações aceitas por search_products (o id desempata)
+    SORT_COLUMNS = {"id": "id", "price": "preco", "name": "nome"}
+    # Colunas usadas pela listagem, na ordem dos campos de Product
+    PRODUCT_COLUMNS = "id, nome, LEFT(descricao, %d) AS descricao, preco, imagem_url, imagem_thumbs" % DESCRIPTION_PREVIEW_LENGTH
+    # As mesmas colunas em um banco em que schema.sql ainda não criou imagem_thumbs
+    LEGACY_PRODUCT_COLUMNS = PRODUCT_COLUMNS.replace("imagem_thumbs", "NULL AS imagem_thumbs")
+
+    # Pools e caches compartilhados pelo processo, um por servidor/banco/usuário
+    _pools = {}
+    _page_caches = {}
+    _shared_lock = threading.Lock()
+    # Pools de bancos sem a coluna imagem_thumbs (schema.sql não executado)
+    _outdated_schemas = weakref.WeakSet()
+    # Uploads em andamento no processo: (connection string, container, nome) -> Future
+    _uploads = {}
+    _uploads_lock = threading.Lock()
+
+    def __init__(self, pool=None, page_cache=None):
         # Carrega as variáveis de ambiente do arquivo .env
         load_dotenv()
         self.blob_connection_string = os.getenv("BLOB_CONNECTION_STRING")
@@ -17,177 +54,761 @@ class ControlDB:
         self.sql_user = os.getenv("SQL_USER")
         self.sql_password = os.getenv("SQL_PASSWORD")
 
-    def upload_blob(self, file_path):
+        # Pool de conexões reaproveitado entre reruns do Streamlit
+        self.pool = pool or self._get_shared(ControlDB._pools, self._new_pool)
+        # Cache das páginas da listagem, compartilhado entre as sessões.
+        # Com um pool próprio (ex.: testes) o cache também é próprio.
+        if page_cache is None:
+            page_cache = self._new_page_cache() if pool else self._get_shared(ControlDB._page_caches, self._new_page_cache)
+        self.page_cache = page_cache
+
+    def _get_shared(self, registry, factory):
+        """
+        Retorna o objeto do processo para as credenciais atuais,
+        criando-o com `factory` na primeira chamada.
+        """
+        key = (self.sql_server, self.sql_database, self.sql_user)
+        with ControlDB._shared_lock:
+            shared = registry.get(key)
+            if shared is None:
+                shared = registry[key] = factory()
+            return shared
+
+    def _new_pool(self):
+        return ConnectionPool(
+            self._connect,
+            max_size=int(os.getenv("SQL_POOL_SIZE", "5")),
+            max_idle=float(os.getenv("SQL_POOL_MAX_IDLE", "300")),
+            timeout=float(os.getenv("SQL_POOL_TIMEOUT", "10")),
+        )
+
+    @staticmethod
+    def _new_page_cache():
+        return TTLCache(
+            maxsize=int(os.getenv("PAGE_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("PAGE_CACHE_TTL", "30")),
+        )
+
+    def _connect(self):
+        # Abre uma nova conexão com o SQL Server (usada apenas pelo pool)
+        return pymssql.connect(server=self.sql_server, user=self.sql_user, password=self.sql_password, database=self.sql_database)
+
+    @property
+    def container_client(self):
         """
-        Faz o upload de um arquivo para o Azure Blob Storage.
+        ContainerClient compartilhado pelo processo (conexões HTTP reaproveitadas).
+        """
+        return BlobClient.get_container_client(self.blob_connection_string, self.blob_container_name)
+
+    def pool_stats(self):
+        """
+        Retorna as métricas do pool de conexões (empréstimos, esperas, tempo de espera).
+        """
+        return self.pool.stats()
+
+    def cache_stats(self):
+        """
+        Retorna as métricas do cache da listagem (acertos, faltas, invalidações).
+        """
+        return self.page_cache.stats()
+
+    @Metrics.timed("blob.upload_blob")
+    def upload_blob(self, data, file_name=None, held=None):
+        """
+        Faz o upload de uma imagem para o Azure Blob Storage.
+        `data` pode ser o conteúdo em memória (bytes, bytearray ou memoryview,
+        com o nome em `file_name`) ou o caminho de um arquivo local.
+        O blob é nomeado pelo hash do conteúdo, então uma imagem idêntica a
+        uma já enviada não é enviada de novo. Com `held` (de _holding_blobs),
+        o blob fica reservado contra a fila de exclusão.
         Retorna a URL do blob ou None em caso de erro.
         """
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(self.blob_connection_string)
-            container_client = blob_service_client.get_container_client(self.blob_container_name)
-            
-            # Gera um nome único para o blob
-            file_name = file_path.split('/')[-1]
-            blob_name = f"{uuid.uuid4()}_{file_name}"
-            blob_client = container_client.get_blob_client(blob_name)
-            
-            # Faz o upload do arquivo
-            with open(file_path, "rb") as file:
-                blob_client.upload_blob(file, overwrite=True)
-            
-            # Retorna a URL do blob
-            return f"https://{self.blob_account_name}.blob.core.windows.net/{self.blob_container_name}/{blob_name}"
+            blobs, image_url, _ = self.plan_image_upload(data, file_name)
+            for blob_name, body in blobs.items():
+                self._put_blob(blob_name, body, held)
+            return image_url
         except Exception as e:
             print(f"Erro ao fazer upload do blob: {e}")
+            Metrics.error("blob.upload_blob")
             return None
 
-    def save_product_to_db(self, name, price, description, image):
+    def plan_image_upload(self, image, image_name=None, blob_prefix=""):
+        """
+        Calcula, sem enviar nada, os blobs de uma imagem ou de suas versões.
+        Como os nomes vêm do hash do conteúdo, as URLs são conhecidas antes do
+        upload. Retorna ({nome do blob: bytes}, URL principal, JSON
+        {lado: URL} ou None).
+        """
+        if isinstance(image, dict):
+            # Todas as versões levam o hash do conjunto: imagens iguais geram os
+            # mesmos nomes, e as versões de uma imagem só são apagadas junto com ela
+            digest = hashlib.sha256()
+            for size in sorted(image):
+                digest.update(image[size])
+            names = {size: f"{blob_prefix}{digest.hexdigest()}_{size}.webp" for size in image}
+            urls = {size: self._blob_url(name) for size, name in names.items()}
+            blobs = {names[size]: bytes(data) if not isinstance(data, bytes) else data for size, data in image.items()}
+            # A maior versão é a imagem principal
+            return blobs, urls[max(urls)], json.dumps(urls)
+
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            # O SDK do Azure só envia bytes/streams; bytes não são copiados
+            body = image if isinstance(image, bytes) else bytes(image)
+            image_name = image_name or "imagem.webp"
+        else:
+            with open(image, "rb") as file:
+                body = file.read()
+            image_name = image_name or image.split('/')[-1]
+        # Nome endereçado pelo conteúdo: sha256 + extensão original
+        extension = os.path.splitext(image_name)[1] or ".webp"
+        blob_name = f"{blob_prefix}{hashlib.sha256(body).hexdigest()}{extension}"
+        return {blob_name: body}, self._blob_url(blob_name), None
+
+    def _put_blob(self, blob_name, body, held=None):
+        """
+        Envia o conteúdo com o nome informado, a menos que o blob já exista.
+        A existência é sempre consultada no Blob Storage: um índice local não
+        veria exclusões feitas por outros processos. Envios simultâneos do
+        mesmo blob no processo esperam pelo primeiro em vez de repeti-lo.
+        Com `held`, reserva o blob antes da consulta, para que uma exclusão
+        pendente do mesmo conteúdo não o apague depois dela.
+        """
+        if held is not None:
+            self._delete_queue().hold([blob_name])
+            held.append(blob_name)
+        key = self._blob_key(blob_name)
+        with ControlDB._uploads_lock:
+            upload = ControlDB._uploads.get(key)
+            owner = upload is None
+            if owner:
+                upload = ControlDB._uploads[key] = Future()
+        if not owner:
+            upload.result()
+            return
+        try:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            with Metrics.timer("blob.exists"):
+                exists = blob_client.exists()
+            if not exists:
+                with Metrics.timer("blob.upload"):
+                    blob_client.upload_blob(body, overwrite=True)
+                Metrics.add_bytes("blob.upload", len(body))
+            upload.set_result(None)
+        except BaseException as e:
+            upload.set_exception(e)
+            raise
+        finally:
+            with ControlDB._uploads_lock:
+                del ControlDB._uploads[key]
+
+    @contextmanager
+    def _holding_blobs(self):
+        """
+        Fornece a lista `held` dos uploads: os blobs enviados com ela ficam
+        reservados (BlobDeleteQueue.hold) até o fim do bloco, que deve incluir
+        o commit do produto que os usa.
+        """
+        held = []
+        try:
+            yield held
+        finally:
+            if held:
+                self._delete_queue().release(held)
+
+    def _delete_queue(self):
+        return BlobDeleteQueue.get_delete_queue(self.blob_connection_string, self.blob_container_name)
+
+    def _blob_key(self, blob_name):
+        # Identifica o blob entre containers e contas (uploads em andamento)
+        return (self.blob_connection_string, self.blob_container_name, blob_name)
+
+    def _blob_url(self, blob_name):
+        return f"https://{self.blob_account_name}.blob.core.windows.net/{self.blob_container_name}/{blob_name}"
+
+    @Metrics.timed("blob.upload_image")
+    def upload_image(self, image, image_name=None, blob_prefix="", held=None):
+        """
+        Faz o upload de uma imagem ou de todas as suas versões.
+        `image` pode ser o que upload_blob aceita ou um dicionário
+        {lado: bytes} gerado por ImageProcessor.renditions (com os nomes dos
+        blobs iniciados por `blob_prefix`). `held` como em upload_blob.
+        Retorna (URL principal, JSON {lado: URL} ou None), ou (None, None)
+        em caso de erro.
+        """
+        try:
+            blobs, image_url, thumbnails = self.plan_image_upload(image, image_name, blob_prefix)
+            for blob_name, body in blobs.items():
+                self._put_blob(blob_name, body, held)
+            return image_url, thumbnails
+        except Exception as e:
+            print(f"Erro ao fazer upload do blob: {e}")
+            Metrics.error("blob.upload_image")
+            return None, None
+
+    @Metrics.timed("db.save_product")
+    def save_product_to_db(self, name, price, description, image=None, image_name=None, image_urls=None):
         """
         Salva um novo produto no banco de dados.
-        Faz o upload da imagem para o Azure Blob Storage e salva a URL no banco.
+        Faz o upload da imagem (bytes, caminho ou versões) para o Azure Blob
+        Storage e salva as URLs no banco. Com `image_urls` (o retorno de
+        upload_image, ex.: o placeholder) nenhum upload é feito.
         """
         try:
-            # Faz o upload da imagem e obtém a URL
-            image_url = self.upload_blob(image)
-            if not image_url:
-                return False
-            
-            # Conecta ao banco de dados e insere o produto
-            conn = pymssql.connect(server=self.sql_server, user=self.sql_user, password=self.sql_password, database=self.sql_database)
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO Produtos (nome, descricao, preco, imagem_url) VALUES (%s, %s, %s, %s)",
-                (name, description, price, image_url)
-            )
-            conn.commit()
-            cursor.close()
-            conn.close()
+            # Os blobs ficam reservados contra a fila de exclusão até o commit
+            with self._holding_blobs() as held:
+                # Faz o upload da imagem e obtém a URL
+                image_url, thumbnails = image_urls or self.upload_image(image, image_name, held=held)
+                if not image_url:
+                    return False
+
+                # Pega uma conexão do pool e insere o produto
+                with self.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "INSERT INTO Produtos (nome, descricao, preco, imagem_url, imagem_thumbs) VALUES (%s, %s, %s, %s, %s)",
+                        (name, description, price, image_url, thumbnails)
+                    )
+                    conn.commit()
+                    cursor.close()
+            self.page_cache.invalidate()
             return True
         except Exception as e:
             print(f"Erro ao salvar produto no banco de dados: {e}")
+            Metrics.error("db.save_product")
             return False
         
-    def list_products_from_db(self, page: int = 1, page_size: int = 10):
+    @Metrics.timed("db.bulk_save_products")
+    def bulk_save_products(self, products, batch_size=500, max_workers=8, on_batch=None, on_error=None):
         """
-        Lista os produtos do banco de dados com paginação.
-        Retorna uma lista de produtos ou uma lista vazia em caso de erro.
+        Salva muitos produtos de uma vez.
+        Cada produto é um dicionário com name, price, description e image
+        (caminho local ou bytes, com image_name opcional) ou image_url (imagem já hospedada). As imagens são
+        enviadas em paralelo por até `max_workers` threads e as linhas são
+        inseridas em lotes de `batch_size`, cada lote em uma única transação.
+
+        `on_batch(processados, stats)` é chamado após cada commit, o que permite
+        retomar a importação do ponto em que parou; `on_error(produto)` recebe
+        os produtos cuja imagem não pôde ser enviada. Erros de banco
+        interrompem a importação (o lote em andamento é desfeito).
+        Retorna um dicionário com as contagens e o tempo de cada etapa.
         """
-        try:
-            offset = (page - 1) * page_size
-            conn = pymssql.connect(
-                server=self.sql_server,
-                user=self.sql_user,
-                password=self.sql_password,
-                database=self.sql_database
-            )
+        stats = {
+            "processed": 0,
+            "saved": 0,
+            "failed": 0,
+            "batches": 0,
+            "uploads": 0,
+            "upload_seconds": 0.0,
+            "insert_seconds": 0.0,
+            "elapsed": 0.0,
+        }
+        start = time.perf_counter()
+        products = iter(products)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                batch = list(islice(products, batch_size))
+                if not batch:
+                    break
+
+                # Os blobs do lote ficam reservados contra a fila de exclusão até o commit
+                with self._holding_blobs() as held:
+                    # Etapa 1: uploads em paralelo
+                    t0 = time.perf_counter()
+                    image_urls = list(executor.map(lambda product: self._resolve_image_url(product, held), batch))
+                    stats["upload_seconds"] += time.perf_counter() - t0
+                    stats["uploads"] += sum(1 for p in batch if not p.get("image_url") and p.get("image"))
+
+                    rows = []
+                    for product, image_url in zip(batch, image_urls):
+                        if image_url:
+                            rows.append((product["name"], product["description"], product["price"], image_url))
+                        else:
+                            stats["failed"] += 1
+                            if on_error:
+                                on_error(product)
+
+                    # Etapa 2: inserção do lote em uma transação
+                    t0 = time.perf_counter()
+                    self._insert_rows(rows)
+                    stats["insert_seconds"] += time.perf_counter() - t0
+
+                stats["processed"] += len(batch)
+                stats["saved"] += len(rows)
+                stats["batches"] += 1
+                stats["elapsed"] = time.perf_counter() - start
+                if on_batch:
+                    on_batch(stats["processed"], stats)
+        stats["elapsed"] = time.perf_counter() - start
+        return stats
+
+    def _resolve_image_url(self, product, held=None):
+        # Usa a URL já informada ou faz o upload da imagem local
+        if product.get("image_url"):
+            return product["image_url"]
+        if product.get("image"):
+            return self.upload_blob(product["image"], product.get("image_name"), held)
+        return None
+
+    @Metrics.timed("db.insert_rows")
+    def _insert_rows(self, rows):
+        """
+        Insere as linhas (nome, descricao, preco, imagem_url) em uma única
+        transação, usando INSERTs de várias linhas para poupar round trips.
+        """
+        if not rows:
+            return
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
-            query = f"""
-                SELECT * FROM Produtos
-                ORDER BY id  
-                OFFSET %s ROWS
-                FETCH NEXT %s ROWS ONLY;
-            """
-            cursor.execute(query, (offset, page_size))
-            products = cursor.fetchall()
+            for i in range(0, len(rows), self.INSERT_ROWS_PER_STATEMENT):
+                chunk = rows[i:i + self.INSERT_ROWS_PER_STATEMENT]
+                values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+                params = tuple(value for row in chunk for value in row)
+                cursor.execute(f"INSERT INTO Produtos (nome, descricao, preco, imagem_url) VALUES {values}", params)
+            conn.commit()
             cursor.close()
-            conn.close()
-            return products
+        self.page_cache.invalidate()
+
+    @Metrics.timed("db.list_products")
+    def list_products_from_db(self, page: int = 1, page_size: int = 10, after_id=None):
+        """
+        Lista os produtos do banco de dados com paginação, como registros Product
+        com apenas as colunas usadas pela listagem. Busca page_size + 1 linhas
+        para saber, sem outra consulta, se existe uma próxima página.
+        As páginas ficam no cache por PAGE_CACHE_TTL segundos.
+        Com `after_id` usa paginação por cursor (keyset): busca os produtos com
+        id maior que o último já exibido, sem varrer as páginas anteriores, e
+        `page` é ignorado. Sem `after_id` usa OFFSET a partir de `page`.
+        Retorna um ProductPage (vazio em caso de erro).
+        """
+        key = ("after", after_id, page_size) if after_id is not None else ("page", page, page_size)
+        cached = self.page_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            generation = self.page_cache.generation
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                if after_id is not None:
+                    query = f"""
+                        SELECT TOP (%s) {self.PRODUCT_COLUMNS} FROM Produtos
+                        WHERE id > %s
+                        ORDER BY id;
+                    """
+                    rows = self._select_products(cursor, query, (page_size + 1, after_id))
+                else:
+                    offset = (page - 1) * page_size
+                    query = f"""
+                        SELECT {self.PRODUCT_COLUMNS} FROM Produtos
+                        ORDER BY id  
+                        OFFSET %s ROWS
+                        FETCH NEXT %s ROWS ONLY;
+                    """
+                    rows = self._select_products(cursor, query, (offset, page_size + 1))
+                page = self._to_page(rows, page_size)
+                cursor.close()
+            self.page_cache.set(key, page, generation)
+            return page
         except Exception as e:
             print(f"Erro ao listar produtos do banco de dados: {e}")
-            return []
+            Metrics.error("db.list_products")
+            return ProductPage((), False)
     
-    def update_product_in_db(self, product_id, name, price, description, image_path=None):
+    @Metrics.timed("db.search_products")
+    def search_products(self, name_prefix=None, min_price=None, max_price=None, sort="id", after=None, page_size=10):
+        """
+        Busca produtos pelo início do nome e/ou por faixa de preço, ordenados
+        por id, preço ("price") ou nome ("name"), com paginação por cursor.
+        `after` é o cursor do último produto exibido (ver search_cursor).
+        As consultas usam os índices de nome e preço de schema.sql e ficam no
+        cache da listagem. Retorna um ProductPage (vazio em caso de erro).
+        """
+        sort_column = self.SORT_COLUMNS[sort]
+        conditions, filter_params = self._filter_conditions(name_prefix, min_price, max_price)
+        params = [page_size + 1] + filter_params  # Uma linha a mais indica que há próxima página
+        if after is not None:
+            if sort_column == "id":
+                conditions.append("id > %s")
+                params.append(after[0])
+            else:
+                conditions.append(f"({sort_column} > %s OR ({sort_column} = %s AND id > %s))")
+                params.extend([after[0], after[0], after[1]])
+
+        key = ("search", name_prefix, min_price, max_price, sort, after, page_size)
+        cached = self.page_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            generation = self.page_cache.generation
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            order = "id" if sort_column == "id" else f"{sort_column}, id"
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                rows = self._select_products(cursor, f"""
+                    SELECT TOP (%s) {self.PRODUCT_COLUMNS} FROM Produtos
+                    {where}
+                    ORDER BY {order};
+                """, tuple(params))
+                page = self._to_page(rows, page_size)
+                cursor.close()
+            self.page_cache.set(key, page, generation)
+            return page
+        except Exception as e:
+            print(f"Erro ao buscar produtos no banco de dados: {e}")
+            Metrics.error("db.search_products")
+            return ProductPage((), False)
+
+    def _select_products(self, cursor, query, params):
+        """
+        Executa uma consulta que seleciona PRODUCT_COLUMNS e retorna as linhas.
+        Em um banco sem a coluna imagem_thumbs (schema.sql não executado),
+        avisa uma vez e passa a selecionar NULL no lugar dela.
+        """
+        if self.schema_outdated():
+            query = query.replace(self.PRODUCT_COLUMNS, self.LEGACY_PRODUCT_COLUMNS)
+        try:
+            cursor.execute(query, params)
+        except Exception:
+            if self.schema_outdated():
+                raise
+            cursor.execute("SELECT COL_LENGTH('Produtos', 'imagem_thumbs')")
+            row = cursor.fetchone()
+            if row is None or row[0] is not None:
+                raise
+            ControlDB._outdated_schemas.add(self.pool)
+            print("Aviso: a coluna Produtos.imagem_thumbs não existe. Execute schema.sql no banco.")
+            cursor.execute(query.replace(self.PRODUCT_COLUMNS, self.LEGACY_PRODUCT_COLUMNS), params)
+        return cursor.fetchall()
+
+    def schema_outdated(self):
+        """
+        True se o banco ainda não tem a coluna imagem_thumbs de schema.sql
+        (detectado pela primeira listagem). Cadastros, edições e exclusões falham até
+        que schema.sql seja executado.
+        """
+        return self.pool in ControlDB._outdated_schemas
+
+    @staticmethod
+    def _filter_conditions(name_prefix=None, min_price=None, max_price=None):
+        # Condições do WHERE (e seus parâmetros) para o prefixo do nome e a faixa de preço
+        conditions = []
+        params = []
+        if name_prefix:
+            # Prefixo com os curingas do LIKE escapados, para usar o índice de nome
+            escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("[", "\\[")
+            conditions.append("nome LIKE %s ESCAPE '\\'")
+            params.append(escaped + "%")
+        if min_price is not None:
+            conditions.append("preco >= %s")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("preco <= %s")
+            params.append(max_price)
+        return conditions, params
+
+    @staticmethod
+    def search_cursor(product, sort="id"):
+        """
+        Cursor para continuar a busca depois de `product` na ordenação `sort`.
+        """
+        if sort == "price":
+            return (product.price, product.id)
+        if sort == "name":
+            return (product.name, product.id)
+        return (product.id,)
+
+    @Metrics.timed("db.count_products")
+    def count_products(self, approximate=True):
+        """
+        Total de produtos para o paginador, guardado no cache da listagem.
+        Com `approximate` lê a contagem de linhas mantida pelo SQL Server nos
+        metadados (sys.partitions), sem varrer a tabela; o valor pode diferir
+        um pouco do real logo após escritas. Retorna None em caso de erro.
+        """
+        key = ("count", approximate)
+        cached = self.page_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            generation = self.page_cache.generation
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                if approximate:
+                    cursor.execute("""
+                        SELECT SUM(rows) FROM sys.partitions
+                        WHERE object_id = OBJECT_ID('Produtos') AND index_id IN (0, 1);
+                    """)
+                else:
+                    cursor.execute("SELECT COUNT_BIG(*) FROM Produtos")
+                total = int(cursor.fetchone()[0] or 0)
+                cursor.close()
+            self.page_cache.set(key, total, generation)
+            return total
+        except Exception as e:
+            print(f"Erro ao contar produtos: {e}")
+            Metrics.error("db.count_products")
+            return None
+
+    def _to_page(self, rows, page_size):
+        # Converte as page_size + 1 linhas buscadas em um ProductPage
+        return ProductPage(tuple(self._to_product(row) for row in rows[:page_size]), len(rows) > page_size)
+
+    @staticmethod
+    def _to_product(row):
+        # Converte uma linha de PRODUCT_COLUMNS em Product
+        *fields, thumbnails = row
+        if thumbnails:
+            thumbnails = {int(size): url for size, url in json.loads(thumbnails).items()}
+        return Product(*fields, thumbnails=thumbnails or None)
+
+    @Metrics.timed("db.get_product_description")
+    def get_product_description(self, product_id):
+        """
+        Busca a descrição completa de um produto (usada ao abrir a edição).
+        Retorna None se o produto não existir ou em caso de erro.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT descricao FROM Produtos WHERE id = %s", (product_id,))
+                result = cursor.fetchone()
+                cursor.close()
+            return result[0] if result else None
+        except Exception as e:
+            print(f"Erro ao buscar a descrição do produto: {e}")
+            Metrics.error("db.get_product_description")
+            return None
+
+    @Metrics.timed("db.update_product")
+    def update_product_in_db(self, product_id, name, price, description, image=None, image_name=None, image_urls=None):
         """
         Atualiza os dados de um produto no banco de dados.
-        Se uma nova imagem for enviada, faz o upload e atualiza a URL.
+        Se uma nova imagem (bytes, caminho ou versões) for enviada, faz o
+        upload e atualiza as URLs; `image_urls` troca a imagem sem upload.
         """
         try:
-            conn = pymssql.connect(
-                server=self.sql_server,
-                user=self.sql_user,
-                password=self.sql_password,
-                database=self.sql_database
-            )
-            cursor = conn.cursor()
+            # Os blobs da nova imagem ficam reservados contra a fila de exclusão até o commit
+            with self._holding_blobs() as held:
+                if image or image_urls:
+                    # Faz o upload da nova imagem antes de ocupar uma conexão
+                    image_url, thumbnails = image_urls or self.upload_image(image, image_name, held=held)
+                    if not image_url:
+                        return False
 
-            if image_path:
-                # Faz o upload da nova imagem e obtém a URL
-                image_url = self.upload_blob(image_path)
-                if not image_url:
-                    return False
-                # Atualiza todos os campos, incluindo a imagem
-                cursor.execute("""
-                    UPDATE Produtos 
-                    SET nome = %s, descricao = %s, preco = %s, imagem_url = %s
-                    WHERE id = %s
-                """, (name, description, price, image_url, product_id))
-            else:
-                # Atualiza apenas os campos de texto e preço
-                cursor.execute("""
-                    UPDATE Produtos 
-                    SET nome = %s, descricao = %s, preco = %s
-                    WHERE id = %s
-                """, (name, description, price, product_id))
+                with self.pool.connection() as conn:
+                    cursor = conn.cursor()
 
-            conn.commit()
-            cursor.close()
-            conn.close()
+                    if image or image_urls:
+                        # Atualiza todos os campos, incluindo a imagem
+                        cursor.execute("""
+                            UPDATE Produtos 
+                            SET nome = %s, descricao = %s, preco = %s, imagem_url = %s, imagem_thumbs = %s
+                            WHERE id = %s
+                        """, (name, description, price, image_url, thumbnails, product_id))
+                    else:
+                        # Atualiza apenas os campos de texto e preço
+                        cursor.execute("""
+                            UPDATE Produtos 
+                            SET nome = %s, descricao = %s, preco = %s
+                            WHERE id = %s
+                        """, (name, description, price, product_id))
+
+                    conn.commit()
+                    cursor.close()
+            self.page_cache.invalidate()
             return True
         except Exception as e:
             print(f"Erro ao atualizar o produto no banco de dados: {e}")
+            Metrics.error("db.update_product")
             return False
 
-    def delete_blob(self, product_id):
+    @Metrics.timed("db.update_products")
+    def update_products(self, changes):
         """
-        Deleta o blob associado a um produto no Azure Blob Storage.
+        Atualiza vários produtos em uma única transação.
+        `changes` é uma sequência de dicionários com o id e os campos a mudar
+        (name, description e/ou price); campos ausentes ficam como estão e,
+        se o mesmo id aparecer mais de uma vez, as alterações são combinadas
+        campo a campo (o último valor informado vence).
+        As alterações vão para uma tabela temporária, com INSERTs de várias
+        linhas, e um único UPDATE ... FROM as aplica.
+        Retorna o número de produtos atualizados ou None em caso de erro.
         """
+        merged = {}
+        for change in changes:
+            fields = merged.setdefault(change["id"], {})
+            fields.update((field, value) for field, value in change.items() if value is not None)
+        rows = [(product_id, fields.get("name"), fields.get("description"), fields.get("price")) for product_id, fields in merged.items()]
+        if not rows:
+            return 0
         try:
-            conn = pymssql.connect(
-                server=self.sql_server,
-                user=self.sql_user,
-                password=self.sql_password,
-                database=self.sql_database
-            )
-            cursor = conn.cursor()
-
-            # Busca a URL da imagem associada ao produto
-            cursor.execute("SELECT imagem_url FROM Produtos WHERE id = %s", (product_id,))
-            result = cursor.fetchone()
-            if result:
-                image_url = result[0]
-                # Extrai o nome do blob da URL
-                blob_name = image_url.split("/")[-1]
-                blob_service_client = BlobServiceClient.from_connection_string(self.blob_connection_string)
-                container_client = blob_service_client.get_container_client(self.blob_container_name)
-                blob_client = container_client.get_blob_client(blob_name)
-                # Deleta o blob
-                blob_client.delete_blob()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                # Criada dentro da transação: um rollback também a descarta
+                cursor.execute("""
+                    IF OBJECT_ID('tempdb..#alteracoes') IS NOT NULL DROP TABLE #alteracoes;
+                    CREATE TABLE #alteracoes (
+                        id INT PRIMARY KEY,
+                        nome NVARCHAR(255) NULL,
+                        descricao NVARCHAR(MAX) NULL,
+                        preco DECIMAL(10, 2) NULL
+                    );
+                """)
+                for i in range(0, len(rows), self.INSERT_ROWS_PER_STATEMENT):
+                    chunk = rows[i:i + self.INSERT_ROWS_PER_STATEMENT]
+                    values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+                    params = tuple(value for row in chunk for value in row)
+                    cursor.execute(f"INSERT INTO #alteracoes (id, nome, descricao, preco) VALUES {values}", params)
+                cursor.execute("""
+                    SET NOCOUNT ON;
+                    UPDATE Produtos
+                    SET nome = COALESCE(a.nome, Produtos.nome),
+                        descricao = COALESCE(a.descricao, Produtos.descricao),
+                        preco = COALESCE(a.preco, Produtos.preco)
+                    FROM #alteracoes a
+                    WHERE a.id = Produtos.id;
+                    DECLARE @atualizados INT = @@ROWCOUNT;
+                    DROP TABLE #alteracoes;
+                    SELECT @atualizados;
+                """)
+                updated = cursor.fetchone()[0]
+                conn.commit()
+                cursor.close()
+            self.page_cache.invalidate()
+            return updated
         except Exception as e:
-            print(f"Erro ao deletar blob: {e}")
-            return False
+            print(f"Erro ao atualizar produtos em lote: {e}")
+            Metrics.error("db.update_products")
+            return None
 
-    def delete_product_from_db(self, product_id):
+    @Metrics.timed("db.reprice_products")
+    def reprice_products(self, percent, ids=None, name_prefix=None, min_price=None, max_price=None):
         """
-        Deleta um produto do banco de dados e o blob associado no Azure Blob Storage.
+        Reajusta em `percent` % (negativo para desconto) o preço dos produtos
+        selecionados, com UPDATEs baseados em conjunto em uma única transação.
+        A seleção combina `ids` com os filtros de search_products (início do
+        nome e faixa de preço); sem nenhum deles, vale para todos os produtos.
+        Os preços são arredondados para centavos.
+        Retorna o número de produtos atualizados ou None em caso de erro.
         """
-        # Primeiro, tenta deletar o blob associado ao produto
-        self.delete_blob(product_id)
-        # Depois, tenta deletar o produto do banco de dados
+        if percent <= -100:
+            raise ValueError("O reajuste deve ser maior que -100%")
+        conditions, filter_params = self._filter_conditions(name_prefix, min_price, max_price)
+        # Sem ids, um único comando; com ids, um comando por lote de ids
+        id_chunks = [None]
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return 0
+            id_chunks = [ids[i:i + self.UPDATE_IDS_PER_STATEMENT] for i in range(0, len(ids), self.UPDATE_IDS_PER_STATEMENT)]
+        updated = 0
         try:
-            conn = pymssql.connect(
-                server=self.sql_server,
-                user=self.sql_user,
-                password=self.sql_password,
-                database=self.sql_database
-            )
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                for chunk in id_chunks:
+                    chunk_conditions = list(conditions)
+                    params = [percent] + filter_params
+                    if chunk is not None:
+                        chunk_conditions.append(f"id IN ({', '.join(['%s'] * len(chunk))})")
+                        params.extend(chunk)
+                    where = f"WHERE {' AND '.join(chunk_conditions)}" if chunk_conditions else ""
+                    cursor.execute(f"""
+                        SET NOCOUNT ON;
+                        UPDATE Produtos
+                        SET preco = ROUND(preco * (100 + %s) / 100, 2)
+                        {where};
+                        SELECT @@ROWCOUNT;
+                    """, tuple(params))
+                    updated += cursor.fetchone()[0]
+                conn.commit()
+                cursor.close()
+            self.page_cache.invalidate()
+            return updated
+        except Exception as e:
+            print(f"Erro ao reajustar preços: {e}")
+            Metrics.error("db.reprice_products")
+            return None
 
-            # Apaga o produto do banco
-            cursor.execute("DELETE FROM Produtos WHERE id = %s", (product_id,))
-            conn.commit()
+    def _blob_names(self, image_url, thumbnails=None):
+        """
+        Nomes dos blobs da imagem e das versões que podem ser apagados.
+        """
+        image_urls = {image_url}
+        if thumbnails:
+            image_urls.update(json.loads(thumbnails).values())
+        names = []
+        for url in image_urls:
+            # Extrai o nome do blob da URL
+            blob_name = url.split("/")[-1]
+            if blob_name.startswith(self.PROTECTED_BLOB_PREFIX):
+                continue
+            names.append(blob_name)
+        return names
+
+    def is_image_used(self, image_url):
+        """
+        Indica se algum produto ainda usa a imagem (consulta pelo índice de imagem_url).
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT CASE WHEN EXISTS (SELECT 1 FROM Produtos WHERE imagem_url = %s) THEN 1 ELSE 0 END", (image_url,))
+            used = cursor.fetchone()[0] == 1
             cursor.close()
-            conn.close()
-            return True
+        return used
+
+    def delete_product_from_db(self, product_id):
+        """
+        Deleta um produto do banco de dados e, se nenhum outro produto usar a
+        mesma imagem, agenda a exclusão dos blobs associados.
+        """
+        return self.delete_products_from_db([product_id]) is not None
+
+    @Metrics.timed("db.delete_products")
+    def delete_products_from_db(self, product_ids):
+        """
+        Deleta vários produtos em uma única transação.
+        Cada lote de ids é um único comando: DELETE ... OUTPUT devolve as
+        imagens removidas já marcando as que ficaram sem nenhum produto, sem um
+        SELECT prévio. Os blobs órfãos são apagados em segundo plano pela
+        BlobDeleteQueue, que repete em caso de falha.
+        Retorna o número de produtos removidos ou None em caso de erro.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        removed = []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                for i in range(0, len(product_ids), self.DELETE_IDS_PER_STATEMENT):
+                    chunk = product_ids[i:i + self.DELETE_IDS_PER_STATEMENT]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(f"""
+                        SET NOCOUNT ON;
+                        DECLARE @removidos TABLE (imagem_url NVARCHAR(1000), imagem_thumbs NVARCHAR(MAX));
+                        DELETE FROM Produtos
+                        OUTPUT deleted.imagem_url, deleted.imagem_thumbs INTO @removidos
+                        WHERE id IN ({placeholders});
+                        SELECT r.imagem_url, r.imagem_thumbs,
+                               CASE WHEN EXISTS (SELECT 1 FROM Produtos p WHERE p.imagem_url = r.imagem_url) THEN 0 ELSE 1 END
+                        FROM @removidos r;
+                    """, tuple(chunk))
+                    removed.extend(cursor.fetchall())
+                conn.commit()
+                cursor.close()
+            self.page_cache.invalidate()
         except Exception as e:
             print(f"Erro ao deletar produto: {e}")
-            return False
+            Metrics.error("db.delete_products")
+            return None
+
+        # Depois do commit, agenda a exclusão dos blobs que ninguém mais usa
+        orphans = {image_url: thumbnails for image_url, thumbnails, orphan in removed if orphan}
+        if orphans:
+            delete_queue = self._delete_queue()
+            for image_url, thumbnails in orphans.items():
+                delete_queue.put(
+                    self._blob_names(image_url, thumbnails),
+                    still_used=lambda url=image_url: self.is_image_used(url),
+                )
+        return len(removed)
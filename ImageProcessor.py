@@ -1,12 +1,101 @@
+import os
+from io import BytesIO
 from PIL import Image
+import Metrics
+
+# Versões geradas para cada imagem: (lado em pixels, qualidade WEBP).
+# Miniaturas menores toleram uma qualidade menor sem perda visível.
+RENDITIONS = ((64, 60), (150, 70), (300, 80))
+
+# Limites de cada imagem recebida. O de pixels vale para o que será de fato
+# decodificado: um JPEG grande é decodificado já reduzido (draft) e passa, um
+# PNG do mesmo tamanho não. Com os padrões, a imagem decodificada ocupa no
+# máximo ~72 MB (24 MP em RGB).
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "24000000"))
+
+
+class ImageTooLarge(ValueError):
+    """
+    Levantada quando a imagem excede MAX_IMAGE_BYTES ou MAX_IMAGE_PIXELS.
+    """
+
+
+def _byte_size(path):
+    # Tamanho do arquivo ou do restante do stream, sem lê-lo
+    if isinstance(path, (str, os.PathLike)):
+        return os.path.getsize(path)
+    position = path.tell()
+    size = path.seek(0, os.SEEK_END) - position
+    path.seek(position)
+    return size
+
 
 class ImageProcessor:
-    def __init__(self, path):
+    def __init__(self, path, max_size=None):
+        """
+        Abre e decodifica a imagem em RGB. Com `max_size` (largura, altura),
+        o maior tamanho que será gerado, JPEGs são decodificados direto em
+        escala reduzida (1/2, 1/4 ou 1/8), sem alocar a imagem inteira.
+        Levanta ImageTooLarge se a imagem passar dos limites.
+        """
         self.path = path
-        self.image = Image.open(path).convert("RGB")  # Converte para RGB ao abrir
+        if _byte_size(path) > MAX_IMAGE_BYTES:
+            raise ImageTooLarge(f"Imagem maior que {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+        with Metrics.timer("image.open"):
+            source = Image.open(path)  # Só lê o cabeçalho
+            if max_size:
+                source.draft("RGB", max_size)
+            width, height = source.size
+            if width * height > MAX_IMAGE_PIXELS:
+                source.close()
+                raise ImageTooLarge(f"Imagem de {width}x{height} pixels excede o limite de {MAX_IMAGE_PIXELS} pixels")
+            if source.mode == "RGB":
+                source.load()
+                self.image = source
+            else:
+                self.image = source.convert("RGB")  # Converte para RGB ao abrir
+                source.close()
+
+    @staticmethod
+    def max_size(ladder=RENDITIONS):
+        # Maior tamanho gerado pelas versões de `ladder`, para o `max_size` do construtor
+        side = max(size for size, _ in ladder)
+        return side, side
 
     def resize(self, width, height):
-        self.image = self.image.resize((width, height))
+        with Metrics.timer("image.resize"):
+            self.image = self._scaled(self.image, width, height)
+
+    @staticmethod
+    def _scaled(image, width, height):
+        # LANCZOS com reducing_gap: reduz primeiro por um fator inteiro (barato)
+        # e só então aplica o filtro, com qualidade quase igual à do LANCZOS puro
+        return image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
 
     def save(self, output_path):
-        self.image.save(output_path, format='WEBP')  # Salva em formato WEBP
\ No newline at end of file
+        self.image.save(output_path, format='WEBP')  # Salva em formato WEBP
+
+    def to_bytes(self, quality=80):
+        # Codifica em WEBP direto na memória, sem passar pelo disco
+        buffer = BytesIO()
+        with Metrics.timer("image.encode"):
+            self.image.save(buffer, format='WEBP', quality=quality)
+        Metrics.add_bytes("image.encode", buffer.tell())
+        return buffer.getvalue()
+
+    def renditions(self, ladder=RENDITIONS):
+        """
+        Gera todas as versões da imagem a partir de uma única decodificação.
+        Retorna {lado: bytes do WEBP}. A imagem original não é alterada.
+        """
+        original = self.image
+        result = {}
+        try:
+            for size, quality in ladder:
+                with Metrics.timer("image.resize"):
+                    self.image = self._scaled(original, size, size)
+                result[size] = self.to_bytes(quality)
+        finally:
+            self.image = original
+        return result
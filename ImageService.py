@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+import ImageProcessor
+import Metrics
+
+
+class ImageServiceBusy(Exception):
+    """
+    Levantada quando a fila de imagens está cheia (backpressure).
+    """
+
+
+def _process_image(data, width, height):
+    # Executado em um processo do pool: decodifica, redimensiona e codifica em WEBP
+    processor = ImageProcessor.ImageProcessor(BytesIO(data), max_size=(width, height))
+    processor.resize(width, height)
+    return processor.to_bytes()
+
+
+def _process_renditions(data, ladder):
+    # Executado em um processo do pool: decodifica uma vez e gera todas as versões
+    processor = ImageProcessor.ImageProcessor(BytesIO(data), max_size=ImageProcessor.ImageProcessor.max_size(ladder))
+    return processor.renditions(ladder)
+
+
+def _measured(fn, *args):
+    # Executado em um processo do pool: devolve também as métricas registradas
+    # no worker, para que o processo principal as some às suas
+    result = fn(*args)
+    return result, Metrics.REGISTRY.drain()
+
+
+class ImageService:
+    """
+    Processa imagens com o ImageProcessor em um pool de processos, fora da
+    thread do script do Streamlit e usando todos os núcleos.
+
+    No máximo `max_pending` imagens ficam na fila ou em processamento; acima
+    disso `submit` espera até `submit_timeout` segundos por uma vaga e então
+    levanta ImageServiceBusy.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, submit_timeout=5.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self.submit_timeout = submit_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # "spawn" evita herdar por fork as threads do servidor do Streamlit
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def submit(self, data, width, height, timeout=None):
+        """
+        Enfileira o processamento da imagem (bytes) e retorna um Future com os
+        bytes do WEBP gerado, que a interface pode consultar.
+        """
+        return self._submit(timeout, _process_image, data, width, height)
+
+    def submit_renditions(self, data, ladder=ImageProcessor.RENDITIONS, timeout=None):
+        """
+        Como `submit`, mas o Future traz todas as versões da imagem
+        ({lado: bytes}), geradas a partir de uma única decodificação.
+        """
+        return self._submit(timeout, _process_renditions, data, ladder)
+
+    def _submit(self, timeout, fn, *args):
+        timeout = self.submit_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise ImageServiceBusy("Fila de processamento de imagens cheia")
+        start = time.perf_counter()
+        try:
+            job = self._executor.submit(_measured, fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future = Future()
+
+        def done(job):
+            self._slots.release()
+            Metrics.observe("image.job", time.perf_counter() - start)
+            try:
+                result, metrics = job.result()
+            except BaseException as e:
+                Metrics.error("image.job")
+                future.set_exception(e)
+            else:
+                Metrics.merge(metrics)
+                future.set_result(result)
+
+        job.add_done_callback(done)
+        return future
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_service = None
+_lock = threading.Lock()
+
+
+def get_image_service():
+    """
+    Retorna o serviço de imagens do processo, criando-o na primeira chamada.
+    Configurado por IMAGE_WORKERS e IMAGE_QUEUE_SIZE.
+    """
+    global _service
+    with _lock:
+        if _service is None:
+            workers = os.getenv("IMAGE_WORKERS")
+            pending = os.getenv("IMAGE_QUEUE_SIZE")
+            _service = ImageService(
+                max_workers=int(workers) if workers else None,
+                max_pending=int(pending) if pending else None,
+            )
+        return _service
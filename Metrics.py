@@ -0,0 +1,221 @@
+"""
+Métricas de latência, volume e erros das operações de banco, blob e imagem.
+
+Cada operação (ex.: "db.save_product", "blob.upload", "image.resize") tem um
+histograma de latência com buckets fixos, um contador de bytes e um de erros.
+Registrar uma medição custa um perf_counter, uma busca binária e um lock, o
+que é desprezível perto de uma consulta ou de um upload.
+
+As métricas podem ser exportadas no formato texto do Prometheus
+(`to_prometheus`) ou gravadas em arquivo (`write`; .json grava o snapshot).
+Com METRICS_FILE definido, o arquivo é gravado ao final do processo.
+METRICS_ENABLED=0 desliga a coleta.
+"""
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites superiores (s) dos buckets dos histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Registry:
+    """
+    Conjunto de métricas de um processo. Seguro para uso entre threads.
+    """
+
+    def __init__(self, buckets=BUCKETS, enabled=True):
+        self.buckets = buckets
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}  # operação -> [contagens por bucket (+Inf no fim), soma]
+        self._bytes = {}
+        self._errors = {}
+
+    def observe(self, operation, seconds):
+        """
+        Registra a duração (s) de uma execução da operação.
+        """
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+
+    def add_bytes(self, operation, amount):
+        if self.enabled:
+            with self._lock:
+                self._bytes[operation] = self._bytes.get(operation, 0) + amount
+
+    def error(self, operation):
+        if self.enabled:
+            with self._lock:
+                self._errors[operation] = self._errors.get(operation, 0) + 1
+
+    @contextmanager
+    def timer(self, operation):
+        """
+        Mede o bloco; exceções que escapam dele contam como erro.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.error(operation)
+            raise
+        finally:
+            self.observe(operation, time.perf_counter() - start)
+
+    def timed(self, operation):
+        """
+        Decorador equivalente a `timer` para funções e métodos.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(operation):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """
+        Retorna uma cópia das métricas, serializável em JSON e aceita por `merge`.
+        """
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "histograms": {op: {"counts": list(h[0]), "sum": h[1]} for op, h in self._histograms.items()},
+                "bytes": dict(self._bytes),
+                "errors": dict(self._errors),
+            }
+
+    def merge(self, snapshot):
+        """
+        Soma ao registro um snapshot de outro processo (ex.: dos workers de imagem).
+        """
+        with self._lock:
+            for op, data in snapshot["histograms"].items():
+                histogram = self._histograms.get(op)
+                if histogram is None:
+                    histogram = self._histograms[op] = [[0] * (len(self.buckets) + 1), 0.0]
+                histogram[0] = [a + b for a, b in zip(histogram[0], data["counts"])]
+                histogram[1] += data["sum"]
+            for op, amount in snapshot["bytes"].items():
+                self._bytes[op] = self._bytes.get(op, 0) + amount
+            for op, count in snapshot["errors"].items():
+                self._errors[op] = self._errors.get(op, 0) + count
+
+    def drain(self):
+        """
+        Retorna o snapshot e zera o registro.
+        """
+        with self._lock:
+            snapshot = {
+                "buckets": list(self.buckets),
+                "histograms": {op: {"counts": h[0], "sum": h[1]} for op, h in self._histograms.items()},
+                "bytes": self._bytes,
+                "errors": self._errors,
+            }
+            self._histograms, self._bytes, self._errors = {}, {}, {}
+        return snapshot
+
+    def reset(self):
+        self.drain()
+
+    def summary(self):
+        """
+        Uma linha por operação com contagem, média, percentis estimados pelos
+        buckets (limite superior do bucket), bytes e erros.
+        """
+        snapshot = self.snapshot()
+        operations = sorted(set(snapshot["histograms"]) | set(snapshot["bytes"]) | set(snapshot["errors"]))
+        rows = []
+        for op in operations:
+            histogram = snapshot["histograms"].get(op, {"counts": [], "sum": 0.0})
+            count = sum(histogram["counts"])
+            rows.append({
+                "operation": op,
+                "count": count,
+                "mean_ms": histogram["sum"] / count * 1000 if count else None,
+                "p50_ms": self._percentile(histogram["counts"], count, 0.50),
+                "p95_ms": self._percentile(histogram["counts"], count, 0.95),
+                "p99_ms": self._percentile(histogram["counts"], count, 0.99),
+                "bytes": snapshot["bytes"].get(op, 0),
+                "errors": snapshot["errors"].get(op, 0),
+            })
+        return rows
+
+    def _percentile(self, counts, total, q):
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= q * total:
+                return bound * 1000
+        return float("inf")
+
+    def to_prometheus(self, prefix="dio"):
+        """
+        Exporta as métricas no formato texto do Prometheus.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_operation_seconds Latência das operações.",
+            f"# TYPE {prefix}_operation_seconds histogram",
+        ]
+        for op, histogram in sorted(snapshot["histograms"].items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_operation_seconds_bucket{{operation="{op}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_operation_seconds_sum{{operation="{op}"}} {histogram["sum"]}')
+            lines.append(f'{prefix}_operation_seconds_count{{operation="{op}"}} {cumulative}')
+        for name, help_text, values in (
+            ("operation_bytes_total", "Bytes processados pelas operações.", snapshot["bytes"]),
+            ("operation_errors_total", "Erros das operações.", snapshot["errors"]),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for op, value in sorted(values.items()):
+                lines.append(f'{prefix}_{name}{{operation="{op}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Grava as métricas em `path` (JSON se terminar em .json, senão texto do
+        Prometheus). A gravação é atômica.
+        """
+        content = json.dumps(self.snapshot()) if path.endswith(".json") else self.to_prometheus()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+
+# Registro do processo, usado por ControlDB, ImageProcessor e ImageService
+REGISTRY = Registry(enabled=os.getenv("METRICS_ENABLED", "1") != "0")
+
+observe = REGISTRY.observe
+add_bytes = REGISTRY.add_bytes
+error = REGISTRY.error
+merge = REGISTRY.merge
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+
+if os.getenv("METRICS_FILE"):
+    atexit.register(REGISTRY.write, os.getenv("METRICS_FILE"))
@@ -0,0 +1,134 @@
+"""
+Imagem padrão dos produtos cadastrados sem foto.
+
+A imagem de PLACEHOLDER_URL é baixada e processada uma única vez: as versões
+geradas ficam em disco (PLACEHOLDER_CACHE_DIR) e as URLs dos blobs enviados
+ficam memorizadas no processo e em disco. Assim, cadastrar um produto sem
+imagem não faz download, processamento nem upload.
+
+Uma nova PLACEHOLDER_URL gera um novo cache automaticamente. Para refazer o
+cache da mesma URL (ex.: a imagem mudou no servidor de origem):
+    python Placeholder.py --refresh
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+import requests
+from dotenv import load_dotenv
+import ControlDB
+import ImageProcessor
+
+# (url, conta, container) -> (URL da imagem principal, JSON das versões)
+_memo = {}
+_lock = threading.Lock()
+
+
+def _cache_dir():
+    return os.getenv("PLACEHOLDER_CACHE_DIR", "temp/placeholder")
+
+
+def _cache_prefix(url):
+    # Arquivos do cache de uma URL: <prefixo>.json e <prefixo>_<lado>.webp
+    return os.path.join(_cache_dir(), hashlib.sha256(url.encode("utf-8")).hexdigest()[:16])
+
+
+def _write_file(path, data):
+    # Grava em um arquivo temporário (um por processo) e renomeia: outro processo
+    # nunca lê um arquivo pela metade
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def _load_renditions(url):
+    """
+    Retorna as versões processadas do placeholder ({lado: bytes}), lendo do
+    disco ou, na primeira vez, baixando e processando a imagem.
+    """
+    prefix = _cache_prefix(url)
+    sizes = [size for size, _ in ImageProcessor.RENDITIONS]
+    paths = {size: f"{prefix}_{size}.webp" for size in sizes}
+    if all(os.path.exists(p) for p in paths.values()):
+        renditions = {}
+        for size, p in paths.items():
+            with open(p, "rb") as file:
+                renditions[size] = file.read()
+        return renditions
+
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    processor = ImageProcessor.ImageProcessor(BytesIO(response.content), max_size=ImageProcessor.ImageProcessor.max_size())
+    renditions = processor.renditions()
+    os.makedirs(_cache_dir(), exist_ok=True)
+    for size, data in renditions.items():
+        _write_file(paths[size], data)
+    return renditions
+
+
+def get_placeholder(db, url):
+    """
+    Retorna (URL da imagem principal, JSON das versões) do placeholder no
+    Blob Storage do `db`, fazendo o upload apenas na primeira vez.
+    """
+    key = (url, db.blob_account_name, db.blob_container_name)
+    with _lock:
+        if key in _memo:
+            return _memo[key]
+
+        index_path = f"{_cache_prefix(url)}.json"
+        try:
+            with open(index_path, encoding="utf-8") as file:
+                index = json.load(file)
+        except (FileNotFoundError, ValueError):
+            index = {"source_url": url, "uploads": {}}
+
+        upload_key = f"{db.blob_account_name}/{db.blob_container_name}"
+        if upload_key in index["uploads"]:
+            urls = tuple(index["uploads"][upload_key])
+        else:
+            urls = db.upload_image(_load_renditions(url), blob_prefix=db.PROTECTED_BLOB_PREFIX)
+            if not urls[0]:
+                raise RuntimeError("Não foi possível enviar o placeholder ao Blob Storage")
+            index["uploads"][upload_key] = list(urls)
+            os.makedirs(_cache_dir(), exist_ok=True)
+            _write_file(index_path, json.dumps(index).encode("utf-8"))
+
+        _memo[key] = urls
+        return urls
+
+
+def refresh(url):
+    """
+    Descarta o cache (memória e disco) do placeholder de `url`; o próximo
+    uso baixa e processa a imagem de novo.
+    """
+    prefix = _cache_prefix(url)
+    with _lock:
+        for key in [k for k in _memo if k[0] == url]:
+            del _memo[key]
+        for size, _ in ImageProcessor.RENDITIONS:
+            if os.path.exists(f"{prefix}_{size}.webp"):
+                os.remove(f"{prefix}_{size}.webp")
+        if os.path.exists(f"{prefix}.json"):
+            os.remove(f"{prefix}.json")
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Gerencia o cache da imagem padrão (PLACEHOLDER_URL).")
+    parser.add_argument("--refresh", action="store_true", help="Descarta o cache e processa a imagem de novo")
+    args = parser.parse_args(argv)
+
+    url = os.getenv("PLACEHOLDER_URL", "")
+    if args.refresh:
+        refresh(url)
+    image_url, _ = get_placeholder(ControlDB.ControlDB(), url)
+    print(f"Placeholder: {image_url}")
+
+
+if __name__ == "__main__":
+    main()
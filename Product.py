@@ -0,0 +1,34 @@
+from typing import NamedTuple, Optional
+from decimal import Decimal
+
+
+class Product(NamedTuple):
+    """
+    Produto como exibido na listagem.
+    `description` traz apenas o início da descrição; o texto completo é
+    carregado sob demanda por ControlDB.get_product_description.
+    `thumbnails` mapeia o lado em pixels de cada versão da imagem para a URL.
+    """
+    id: int
+    name: str
+    description: str
+    price: Decimal
+    image_url: str
+    thumbnails: Optional[dict] = None
+
+    def image_for(self, width):
+        """
+        Retorna a URL da menor versão da imagem com pelo menos `width` pixels
+        (ou a imagem principal, se nenhuma servir).
+        """
+        fits = [size for size in (self.thumbnails or {}) if size >= width]
+        return self.thumbnails[min(fits)] if fits else self.image_url
+
+
+class ProductPage(NamedTuple):
+    """
+    Uma página da listagem ou da busca.
+    `has_next` indica se existe ao menos mais um produto depois desta página.
+    """
+    products: tuple
+    has_next: bool
@@ -1,15 +1,37 @@
-from os import path, getenv, remove
-from time import sleep
+from os import path, getenv
+from time import monotonic, sleep
 import streamlit as st
 import ControlDB
-import ImageProcessor as image
+import ImageProcessor
+import ImageService
+import Metrics
+import Placeholder
 from dotenv import load_dotenv
-from PIL import Image
-import requests
-from io import BytesIO
 
 load_dotenv()
 
+# Tempo máximo (s) de espera pelo processamento de uma imagem
+IMAGE_TIMEOUT = float(getenv("IMAGE_TIMEOUT", "60"))
+# Largura das imagens na listagem para cada tamanho de página: páginas grandes usam miniaturas
+THUMBNAIL_WIDTHS = {10: 300, 20: 150, 50: 150, 100: 64}
+# Ordenações da busca: rótulo exibido -> ordenação de ControlDB.search_products
+SORT_OPTIONS = {"Cadastro": "id", "Preço": "price", "Nome": "name"}
+# Modos de exibição da listagem: rótulo -> modo
+VIEW_MODES = {"Lista": "list", "Grade": "grid"}
+# Quantos produtos o modo lista mostra de cada vez
+LIST_CHUNK_SIZE = 20
+# Painel de métricas na barra lateral (ADMIN_PANEL=1)
+ADMIN_PANEL = getenv("ADMIN_PANEL", "0") == "1"
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def product_rows(products, width):
+    # Linhas da grade de uma página, guardadas entre reruns
+    return [
+        {"Imagem": product.image_for(width), "Nome": product.name, "Descrição": product.description, "Preço": float(product.price)}
+        for product in products
+    ]
+
+
 class ProductApp:
     def __init__(self):
         # Inicializa o título do aplicativo e configurações iniciais
@@ -28,11 +50,19 @@ class ProductApp:
             "editing_product": False,
             "product_page": 1,
             "page_size": 10,
-            "products_size": 0
+            "products_size": 0,
+            "page_cursors": [None],  # Pilha com o cursor do último produto de cada página visitada
+            "search_filters": None,
+            "view_mode": "list",
+            "visible_products": LIST_CHUNK_SIZE
         }
         for key, value in defaults.items():
             if key not in st.session_state:
                 st.session_state[key] = value
+        # Imagens em processamento e os resultados a exibir (não são limpos com o formulário)
+        if "pending_images" not in st.session_state:
+            st.session_state.pending_images = []
+            st.session_state.image_messages = []
     def clear_session_state(self):
         defaults = {
             "product_name": "",
@@ -42,7 +72,11 @@ class ProductApp:
             "editing_product": False,
             "product_page": 1,
             "page_size": 10,
-            "products_size": 0
+            "products_size": 0,
+            "page_cursors": [None],  # Pilha com o cursor do último produto de cada página visitada
+            "search_filters": None,
+            "view_mode": "list",
+            "visible_products": LIST_CHUNK_SIZE
         }
         for key, value in defaults.items():
             st.session_state[key] = value
@@ -90,16 +124,16 @@ class ProductApp:
         description = st.session_state.product_description
         image_file = st.session_state.product_image
 
-        image_path = self.process_image(image_file)  # Processa a imagem enviada
+        if image_file:
+            # A imagem é processada em segundo plano; o produto é gravado quando ela ficar pronta
+            self.process_image(image_file, name=name, price=price, description=description)
+            return
 
-        if self.db.save_product_to_db(name, price, description, image_path):
+        # Sem imagem: usa o placeholder já processado e enviado
+        image_urls = self.placeholder_image_urls()
+        saved = image_urls and self.db.save_product_to_db(name, price, description, image_urls=image_urls)
+        if saved:
             st.success("Produto cadastrado com sucesso!")
-            try:
-                # Remove a imagem temporária após o cadastro
-                if image_path and path.exists(image_path):
-                    remove(image_path)
-            except Exception as e:
-                st.warning(f"Imagem temporária não pôde ser removida: {e}")
         else:
             st.error("Erro ao cadastrar o produto.")
 
@@ -111,45 +145,99 @@ class ProductApp:
         description = st.session_state.product_description
         image_file = st.session_state.product_image
 
-        # Processa a nova imagem, se enviada
-        image_path = self.process_image(image_file) if image_file else None
+        if image_file:
+            # Nova imagem: o produto é atualizado quando ela ficar pronta
+            self.process_image(image_file, product_id=product_id, name=name, price=price, description=description)
+            return
 
-        if self.db.update_product_in_db(product_id, name, price, description, image_path):
+        if self.db.update_product_in_db(product_id, name, price, description):
             st.success("Produto atualizado com sucesso!")
             sleep(1)
         else:
             st.error("Erro ao atualizar o produto.")
 
-    def process_image(self, uploaded_image):
-        # Processa a imagem enviada ou usa um placeholder
+    def process_image(self, uploaded_image, **product):
+        # Envia a imagem para ser processada em outro processo, sem esperar: o Future fica
+        # na sessão e render_pending_images grava o produto (com product_id, atualiza) quando
+        # as versões ficarem prontas. Retorna False se a imagem foi recusada.
+        if uploaded_image.size > ImageProcessor.MAX_IMAGE_BYTES:
+            st.error(f"Imagem muito grande: o limite é {ImageProcessor.MAX_IMAGE_BYTES // (1024 * 1024)} MB.")
+            return False
         try:
-            if uploaded_image:
-                # Processa a imagem enviada pelo usuário
-                image_name = path.splitext(uploaded_image.name)[0]
-                image_path = f"temp/{image_name}.webp"
-                img_processor = image.ImageProcessor(uploaded_image)
-                img_processor.resize(300, 300)
-                img_processor.save(image_path)
-                return image_path
-            else:
-                # Usa o placeholder se nenhuma imagem for enviada
-                placeholder_url = getenv("PLACEHOLDER_URL", "")
-                if placeholder_url.startswith("http"):
-                    response = requests.get(placeholder_url)
-                    if response.status_code == 200:
-                        img = Image.open(BytesIO(response.content))
-                        img = img.resize((300, 300))
-                        image_path = "temp/placeholder.webp"
-                        img.save(image_path)
-                        return image_path
-                    else:
-                        st.error("Erro ao carregar a imagem do link.")
-                        return None
-                else:
-                    st.error("URL do placeholder inválida.")
-                    return None
+            future = ImageService.get_image_service().submit_renditions(uploaded_image.getvalue())
+        except ImageService.ImageServiceBusy:
+            st.error("Muitas imagens em processamento. Tente novamente em instantes.")
+            return False
         except Exception as e:
             st.error(f"Erro ao processar imagem: {e}")
+            return False
+        st.session_state.pending_images.append({
+            "future": future,
+            "image_name": f"{path.splitext(uploaded_image.name)[0]}.webp",
+            "deadline": monotonic() + IMAGE_TIMEOUT,
+            "product": product,
+        })
+        return True
+
+    def render_pending_images(self):
+        # Mostra o resultado das imagens já processadas e acompanha as que faltam
+        for kind, message in st.session_state.image_messages:
+            if kind == "success":
+                st.success(message)
+            else:
+                st.error(message)
+        st.session_state.image_messages = []
+        if st.session_state.pending_images:
+            self.poll_pending_images()
+
+    @st.fragment(run_every=1)
+    def poll_pending_images(self):
+        # Reexecutado a cada segundo enquanto houver imagens em processamento; a página
+        # continua respondendo, sem esperar pelos Futures
+        pending = []
+        for job in st.session_state.pending_images:
+            if job["future"].done():
+                st.session_state.image_messages.append(self.save_processed_image(job))
+            elif monotonic() > job["deadline"]:
+                job["future"].cancel()
+                st.session_state.image_messages.append(("error", f"Tempo esgotado ao processar {job['image_name']}."))
+            else:
+                pending.append(job)
+        finished = len(pending) < len(st.session_state.pending_images)
+        st.session_state.pending_images = pending
+        if finished:
+            # Rerun da página: mostra o resultado e atualiza a listagem
+            st.rerun()
+        st.info(f"Processando {len(pending)} imagem(ns)...")
+
+    def save_processed_image(self, job):
+        # Grava o produto com as versões da imagem. Retorna (tipo, mensagem) para exibir
+        try:
+            renditions = job["future"].result()
+        except ImageProcessor.ImageTooLarge as e:
+            return "error", f"Imagem muito grande: {e}"
+        except Exception as e:
+            return "error", f"Erro ao processar imagem: {e}"
+        product = dict(job["product"])
+        product_id = product.pop("product_id", None)
+        if product_id is not None:
+            if self.db.update_product_in_db(product_id, image=renditions, image_name=job["image_name"], **product):
+                return "success", "Produto atualizado com sucesso!"
+            return "error", "Erro ao atualizar o produto."
+        if self.db.save_product_to_db(image=renditions, image_name=job["image_name"], **product):
+            return "success", "Produto cadastrado com sucesso!"
+        return "error", "Erro ao cadastrar o produto."
+
+    def placeholder_image_urls(self):
+        # URLs do placeholder no Blob Storage; o download e o processamento só acontecem uma vez
+        placeholder_url = getenv("PLACEHOLDER_URL", "")
+        if not placeholder_url.startswith("http"):
+            st.error("URL do placeholder inválida.")
+            return None
+        try:
+            return Placeholder.get_placeholder(self.db, placeholder_url)
+        except Exception as e:
+            st.error(f"Erro ao carregar a imagem do link: {e}")
             return None
 
     def render_product_list(self):
@@ -160,34 +248,77 @@ class ProductApp:
     def setup_product_list(self):
         # Configura a lista de produtos com paginação
         st.header("Produtos Cadastrados")
-        st.session_state.page_size = st.selectbox("Itens por página", [10, 20, 50, 100], index=0)
+        col_size, col_view = st.columns(2)
+        with col_size:
+            page_size = st.selectbox("Itens por página", [10, 20, 50, 100], index=0)
+        with col_view:
+            view_label = st.radio("Exibição", list(VIEW_MODES), horizontal=True)
+        st.session_state.view_mode = VIEW_MODES[view_label]
+
+        # Filtros da busca, resolvidos no banco com os índices de nome e preço
+        with st.expander("Buscar"):
+            name_prefix = st.text_input("Nome começa com", key="search_name").strip()
+            col_min, col_max, col_sort = st.columns(3)
+            with col_min:
+                min_price = st.number_input("Preço mínimo", min_value=0.0, format="%.2f", value=None, key="search_min_price")
+            with col_max:
+                max_price = st.number_input("Preço máximo", min_value=0.0, format="%.2f", value=None, key="search_max_price")
+            with col_sort:
+                sort_label = st.selectbox("Ordenar por", list(SORT_OPTIONS), key="search_sort")
+        sort = SORT_OPTIONS[sort_label]
+
+        filters = (name_prefix, min_price, max_price, sort, page_size)
+        if filters != st.session_state.search_filters:
+            # Mudaram os filtros ou o tamanho da página: os cursores salvos não valem mais
+            st.session_state.search_filters = filters
+            st.session_state.page_size = page_size
+            st.session_state.page_cursors = [None]
+            st.session_state.product_page = 1
+            st.session_state.visible_products = LIST_CHUNK_SIZE
         
         # Configura os botões de paginação
         col1, col2, col3 = st.columns([1, 1, 6])
-        self.products = self.db.list_products_from_db(
-            page=st.session_state.product_page,
-            page_size=st.session_state.page_size
+        # Paginação por cursor: busca a partir do último produto da página anterior
+        page = self.db.search_products(
+            name_prefix=name_prefix or None,
+            min_price=min_price,
+            max_price=max_price,
+            sort=sort,
+            after=st.session_state.page_cursors[-1],
+            page_size=page_size
         )
+        self.products = page.products
         st.session_state.products_size = len(self.products)  # Atualiza o número de produtos na sessão
         
         with col1:
             # Botão para página anterior
-            if st.session_state.product_page > 1:
+            if len(st.session_state.page_cursors) > 1:
                 if st.button("⬅", key="prev_page"):
+                    st.session_state.page_cursors.pop()
                     st.session_state.product_page -= 1
+                    st.session_state.visible_products = LIST_CHUNK_SIZE
                     st.rerun()
+        if self.db.schema_outdated():
+            st.error("O banco não tem a coluna imagem_thumbs: execute schema.sql (veja o README). Até lá, cadastros, edições e exclusões falham.")
         if not self.products:
             st.warning("Nenhum produto cadastrado nesta página.")
             return False
         with col2:
-            # Botão para próxima página
-            if st.button("➡", key="next_page") :
+            # Botão para próxima página, só quando ela existe
+            if page.has_next and st.button("➡", key="next_page") :
+                st.session_state.page_cursors.append(self.db.search_cursor(self.products[-1], sort))
                 st.session_state.product_page += 1
+                st.session_state.visible_products = LIST_CHUNK_SIZE
                 st.rerun()
 
         with col3:
-            # Exibe o número da página atual
-            st.markdown(f"**Página {st.session_state.product_page}**")
+            # Exibe o número da página atual e, sem filtros, o total aproximado de páginas
+            total = None if (name_prefix or min_price is not None or max_price is not None) else self.db.count_products()
+            if total:
+                pages = max(-(-total // page_size), st.session_state.product_page)
+                st.markdown(f"**Página {st.session_state.product_page} de {pages}**")
+            else:
+                st.markdown(f"**Página {st.session_state.product_page}**")
         
         return True
 
@@ -195,10 +326,10 @@ class ProductApp:
     def delete_product(self, product):
         # Confirmação para deletar um produto
         st.subheader("Deletar Produto")
-        st.markdown(f"Você tem certeza que deseja deletar o produto: **{product[1]}**?")
+        st.markdown(f"Você tem certeza que deseja deletar o produto: **{product.name}**?")
 
         if st.button("Sim"):
-            if self.db.delete_product_from_db(product[0]):
+            if self.db.delete_product_from_db(product.id):
                 st.success("Produto deletado com sucesso!")
                 st.rerun()
             else:
@@ -206,36 +337,129 @@ class ProductApp:
         elif st.button("Não"):
             st.rerun()
 
+    @st.dialog("confirmar exclusão")
+    def delete_products(self, products):
+        # Confirmação para deletar vários produtos de uma vez
+        st.subheader("Deletar Produtos")
+        st.markdown(f"Você tem certeza que deseja deletar **{len(products)}** produtos?")
+
+        if st.button("Sim"):
+            if self.db.delete_products_from_db([product.id for product in products]) is not None:
+                st.success("Produtos deletados com sucesso!")
+                st.rerun()
+            else:
+                st.error("Erro ao deletar os produtos.")
+        elif st.button("Não"):
+            st.rerun()
+
     def prepare_edit(self, product):
         # Prepara o formulário para edição de um produto
+        # A listagem traz só o início da descrição; o texto completo é buscado agora
+        description = self.db.get_product_description(product.id)
         st.session_state.update({
-            "product_id": product[0],
+            "product_id": product.id,
             "editing_product": True,
-            "product_name": product[1],
-            "product_description": product[2],
-            "product_price": float(product[3]),
+            "product_name": product.name,
+            "product_description": description if description is not None else product.description,
+            "product_price": float(product.price),
             "product_image": None
         })
         self.render_product_form()
 
     def display_products(self):
-        # Exibe a lista de produtos com opções de editar e deletar
-        for product in self.products:
+        # Exibe a página no modo escolhido. Cada modo é um fragmento: selecionar,
+        # editar, deletar ou mostrar mais produtos reexecuta só o fragmento, sem
+        # buscar a página de novo nem redesenhar o restante da tela
+        if st.session_state.view_mode == "grid":
+            self.display_product_grid()
+        else:
+            self.display_product_list()
+
+    @st.fragment
+    def display_product_grid(self):
+        # Página inteira em um único componente, com miniaturas e seleção de linhas
+        event = st.dataframe(
+            product_rows(self.products, 64),
+            column_config={
+                "Imagem": st.column_config.ImageColumn("Imagem", width="small"),
+                "Preço": st.column_config.NumberColumn("Preço", format="R$ %.2f"),
+            },
+            hide_index=True,
+            row_height=64,
+            on_select="rerun",
+            selection_mode="multi-row",
+            # A seleção vale para esta página apenas
+            key=f"product_grid_{self.products[0].id}_{len(self.products)}",
+        )
+        selected = [self.products[i] for i in event.selection.rows]
+        col1, col2 = st.columns([1, 5])
+        with col1:
+            if len(selected) == 1 and st.button("Editar", key="grid_edit"):
+                self.prepare_edit(selected[0])
+        with col2:
+            if selected and st.button(f"Deletar ({len(selected)})", key="grid_delete"):
+                if len(selected) == 1:
+                    st.session_state.product_id = selected[0].id
+                    self.delete_product(selected[0])
+                else:
+                    self.delete_products(selected)
+
+    @staticmethod
+    def show_more_products():
+        st.session_state.visible_products += LIST_CHUNK_SIZE
+
+    @st.fragment
+    def display_product_list(self):
+        # Lista de produtos com opções de editar e deletar, LIST_CHUNK_SIZE por vez
+        width = THUMBNAIL_WIDTHS.get(st.session_state.page_size, 300)
+        visible = self.products[:st.session_state.visible_products]
+        for product in visible:
             with st.container():
                 cols = st.columns([3, 1, 2, 1, 2, 2])
                 with cols[0]:
-                    st.image(product[4], width=300)
+                    # Usa a menor versão da imagem que cabe na largura exibida
+                    st.image(product.image_for(width), width=width)
                 with cols[1]:
-                    st.markdown(f"**Nome:** {product[1]}")
+                    st.markdown(f"**Nome:** {product.name}")
                 with cols[2]:
-                    st.markdown(f"**Descrição:** {product[2]}")
+                    st.markdown(f"**Descrição:** {product.description}")
                 with cols[3]:
-                    st.markdown(f"**Preço:** R$ {product[3]:.2f}")
+                    st.markdown(f"**Preço:** R$ {product.price:.2f}")
                 with cols[4]:
-                    if st.button("Deletar", key=f"delete_{product[0]}"):
-                        st.session_state.product_id = product[0]
+                    st.checkbox("Selecionar", key=f"select_{product.id}")
+                    if st.button("Deletar", key=f"delete_{product.id}"):
+                        st.session_state.product_id = product.id
                         self.delete_product(product)
                 with cols[5]:
-                    if st.button("Editar", key=f"edit_{product[0]}"):
+                    if st.button("Editar", key=f"edit_{product.id}"):
                         self.prepare_edit(product)
             st.markdown("---")
+
+        if len(visible) < len(self.products):
+            # O callback roda antes do rerun do fragmento, que já mostra o próximo bloco
+            st.button(f"Mostrar mais ({len(self.products) - len(visible)} restantes)", key="show_more", on_click=self.show_more_products)
+
+        # Exclusão em lote dos produtos marcados na página
+        selected = [product for product in visible if st.session_state.get(f"select_{product.id}")]
+        if selected and st.button(f"Deletar selecionados ({len(selected)})", key="delete_selected"):
+            self.delete_products(selected)
+
+    def render_admin_panel(self):
+        # Painel opcional com a latência, o volume e os erros de cada operação
+        if not ADMIN_PANEL:
+            return
+        with st.sidebar:
+            st.header("Métricas")
+            rows = Metrics.REGISTRY.summary()
+            if rows:
+                st.dataframe(rows, hide_index=True)
+            else:
+                st.info("Nenhuma operação registrada ainda.")
+            st.markdown("**Pool de conexões**")
+            st.json(self.db.pool_stats(), expanded=False)
+            st.markdown("**Cache da listagem**")
+            st.json(self.db.cache_stats(), expanded=False)
+            st.download_button("Exportar (Prometheus)", Metrics.REGISTRY.to_prometheus(), file_name="metrics.prom")
+            if st.button("Zerar métricas"):
+                Metrics.REGISTRY.reset()
+                st.rerun()
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache LRU thread-safe em que cada entrada expira após `ttl` segundos.
+
+    `invalidate()` limpa tudo e avança a geração do cache: um valor lido do
+    banco antes de uma invalidação e gravado depois dela (via `set` com a
+    geração antiga) é descartado, evitando trazer de volta dados velhos.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=256, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # chave -> (valor, instante de expiração)
+        self._lock = threading.Lock()
+        self.generation = 0
+
+        # Métricas do cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """
+        Retorna o valor da chave ou `default` se não existir ou tiver expirado.
+        """
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is not self._MISSING and entry[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not self._MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        """
+        Guarda o valor. Se `generation` for informada e o cache tiver sido
+        invalidado desde então, o valor é ignorado.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """
+        Remove todas as entradas (chamado após escritas no banco).
+        """
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Retorna um dicionário com as métricas do cache.
+        """
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
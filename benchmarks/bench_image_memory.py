@@ -0,0 +1,104 @@
+"""
+Mede o pico de memória do processamento de uma imagem (as versões de
+ImageProcessor.RENDITIONS), com e sem a decodificação reduzida e os limites
+de ImageProcessor.
+
+Cada cenário roda em um processo novo, como um worker do ImageService. O pico
+é o aumento do RSS máximo do processo (VmHWM do Linux; o ru_maxrss herdaria o
+pico do processo pai): o tracemalloc não enxerga os buffers de pixels do
+Pillow, alocados fora do Python, e aparece à parte só para os objetos Python
+(bytes recebidos e gerados).
+
+Uso:
+    python benchmarks/bench_image_memory.py --megapixels 48
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def make_image(path, megapixels, format):
+    # Gradiente (comprime como uma foto lisa): o que importa aqui é a resolução
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    gradient = Image.linear_gradient("L").resize((width, height))
+    Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient)).save(path, format=format)
+    return width, height
+
+
+def peak_rss_kb():
+    # Pico de RSS do processo em KB
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB no Linux
+
+
+def process(path, reduced):
+    # Executado em um processo novo: processa a imagem e mede o pico
+    from io import BytesIO
+    import ImageProcessor
+
+    if not reduced:
+        # Como antes: decodifica a imagem inteira, sem limite de pixels
+        ImageProcessor.MAX_IMAGE_PIXELS = 10 ** 12
+    with open(path, "rb") as file:
+        data = file.read()
+    baseline = peak_rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        max_size = ImageProcessor.ImageProcessor.max_size() if reduced else None
+        ImageProcessor.ImageProcessor(BytesIO(data), max_size).renditions()
+        status = "ok"
+    except ImageProcessor.ImageTooLarge:
+        status = "recusada"
+    elapsed = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    peak = peak_rss_kb()
+    return {
+        "status": status,
+        "rss_mb": (peak - baseline) / 1024,
+        "python_mb": python_peak / (1024 * 1024),
+        "ms": elapsed * 1000,
+    }
+
+
+def measure(path, reduced):
+    # Um processo novo por medição: o RSS máximo não diminui depois do pico
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(process, path, reduced).result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=48)
+    args = parser.parse_args(argv)
+
+    print(f"{'imagem':<22} {'modo':<10} {'resultado':<10} {'RSS (MB)':>9} {'Python (MB)':>12} {'tempo (ms)':>11}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for format, megapixels in (("JPEG", args.megapixels), ("PNG", 12), ("PNG", args.megapixels)):
+            path = os.path.join(temp_dir, f"imagem.{format.lower()}")
+            width, height = make_image(path, megapixels, format)
+            label = f"{format} {width}x{height}"
+            for reduced, mode in ((False, "completa"), (True, "reduzida")):
+                result = measure(path, reduced)
+                print(f"{label:<22} {mode:<10} {result['status']:<10} {result['rss_mb']:>9.1f} "
+                      f"{result['python_mb']:>12.1f} {result['ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Suíte de benchmarks reproduzível, sem SQL Server nem Azure: o ControlDB roda
+sobre SQLite (standins.SQLiteDriver) e o Blob Storage é um servidor HTTP
+local no estilo do Azurite (FakeBlobServer).
+
+Mede:
+  - vazão da inserção em lote (bulk_save_products, com URLs prontas);
+  - latência da listagem por OFFSET e por cursor em várias profundidades;
+  - tempo de decodificação e de cada versão da imagem (ImageProcessor);
+  - latência de ponta a ponta do cadastro (versões + upload + INSERT).
+
+Os números servem para comparar versões do código na mesma máquina, não
+para prever a latência contra o SQL Server e o Azure de verdade.
+
+Os resultados são gravados em JSON (--output). Com --compare, são
+comparados a uma execução anterior e o comando termina com código 1 se
+alguma medida piorar mais que --tolerance.
+
+Uso:
+    python benchmarks/bench_local.py --output base.json
+    python benchmarks/bench_local.py --compare base.json --output atual.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ImageProcessor
+import Metrics
+from TTLCache import TTLCache
+from bench_pagination import cursor_for_page
+from common import sample
+from standins import FakeBlobServer, SQLiteDriver, make_db
+
+
+def latency(samples):
+    # Mediana e p95 (ms) das amostras
+    ordered = sorted(samples)
+    return {
+        "value": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "unit": "ms",
+        "better": "lower",
+    }
+
+
+def source_image(seed, size=(1600, 1200)):
+    # Foto sintética em JPEG com ruído (codifica como uma foto, não como uma cor lisa)
+    image = Image.effect_noise(size, 64).convert("RGB")
+    image.putpixel((0, 0), (seed % 256, seed // 256 % 256, 0))  # Conteúdo diferente a cada semente
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def bench_insert(db, rows):
+    products = (
+        {"name": f"Lote {i}", "price": 9.99, "description": "Descrição de teste", "image_url": "https://example.com/p.webp"}
+        for i in range(rows)
+    )
+    stats = db.bulk_save_products(products, batch_size=500)
+    return {"insert.bulk": {"value": stats["saved"] / stats["elapsed"], "unit": "linhas/s", "better": "higher"}}
+
+
+def bench_pagination(db, total_rows, page_size, repeat):
+    results = {}
+    last_page = total_rows // page_size
+    pages = sorted({p for p in (1, 10, 100, 1_000, 10_000, last_page) if 1 <= p <= last_page})
+    for page in pages:
+        after_id = cursor_for_page(db, page, page_size)
+        results[f"list.offset.page_{page}"] = latency(
+            sample(lambda: db.list_products_from_db(page=page, page_size=page_size), repeat))
+        results[f"list.cursor.page_{page}"] = latency(
+            sample(lambda: db.list_products_from_db(page_size=page_size, after_id=after_id), repeat))
+    return results
+
+
+def bench_image(repeat):
+    results = {}
+    data = source_image(0)
+    max_size = ImageProcessor.ImageProcessor.max_size()
+    results["image.decode"] = latency(sample(lambda: ImageProcessor.ImageProcessor(BytesIO(data), max_size), repeat))
+    processor = ImageProcessor.ImageProcessor(BytesIO(data), max_size)
+    for size, quality in ImageProcessor.RENDITIONS:
+        results[f"image.rendition_{size}"] = latency(sample(lambda: processor.renditions(((size, quality),)), repeat))
+    return results
+
+
+def bench_submission(db, repeat):
+    # Uma imagem diferente por cadastro, para que o upload aconteça de fato
+    images = iter([source_image(seed) for seed in range(1, repeat + 2)])
+
+    def submit():
+        processor = ImageProcessor.ImageProcessor(BytesIO(next(images)), ImageProcessor.ImageProcessor.max_size())
+        renditions = processor.renditions()
+        if not db.save_product_to_db("Produto", 19.9, "Descrição", renditions, "foto.webp"):
+            raise RuntimeError("Falha no cadastro")
+
+    return {"submit.end_to_end": latency(sample(submit, repeat))}
+
+
+def run(rows, page_size, repeat, db_path=None):
+    """
+    Executa a suíte e retorna o dicionário de resultados.
+    """
+    Metrics.REGISTRY.reset()
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir, FakeBlobServer() as server:
+        driver = SQLiteDriver(db_path or os.path.join(temp_dir, "bench.db"))
+        driver.seed(rows)
+        # TTL zero: mede o banco, não o cache da listagem
+        db = make_db(server, driver, container="bench", page_cache=TTLCache(ttl=0))
+        results.update(bench_insert(db, rows // 10))
+        results.update(bench_pagination(db, rows, page_size, repeat))
+        results.update(bench_image(repeat))
+        results.update(bench_submission(db, repeat))
+        db.pool.close()
+    return {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "rows": rows,
+            "page_size": page_size,
+            "repeat": repeat,
+        },
+        "results": results,
+        "operations": Metrics.REGISTRY.summary(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Imprime a variação de cada medida e retorna as que pioraram mais que
+    `tolerance` (fração, ex.: 0.2 = 20%).
+    """
+    regressions = []
+    print(f"{'medida':<28} {'base':>12} {'atual':>12} {'variação':>10}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["value"]:
+            continue
+        change = (result["value"] - base["value"]) / base["value"]
+        worse = change > tolerance if result["better"] == "lower" else change < -tolerance
+        if worse:
+            regressions.append(name)
+        flag = "  PIOROU" if worse else ""
+        print(f"{name:<28} {base['value']:>12.2f} {result['value']:>12.2f} {change:>+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Produtos na tabela antes das medições")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", help="Arquivo SQLite a reutilizar (padrão: temporário)")
+    parser.add_argument("--output", help="Grava os resultados neste arquivo JSON")
+    parser.add_argument("--compare", help="Resultados JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Piora aceita na comparação (padrão: 0.2)")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.page_size, args.repeat, args.db)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        if regressions:
+            print(f"Pioraram: {', '.join(regressions)}")
+            return 1
+    else:
+        for name, result in report["results"].items():
+            print(f"{name:<28} {result['value']:>12.2f} {result['unit']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Compara a paginação por OFFSET com a paginação por cursor (keyset) de
+ControlDB.list_products_from_db em várias profundidades.
+
+Usa o SQL Server configurado no .env e, se preciso, completa a tabela
+Produtos até `--rows` linhas: rode contra um banco descartável.
+
+Uso:
+    python benchmarks/bench_pagination.py --rows 1000000 --page-size 10
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ControlDB
+from TTLCache import TTLCache
+from common import measure, seed
+
+
+def cursor_for_page(db, page, page_size):
+    # Último id da página anterior, como ficaria guardado na pilha de cursores
+    if page == 1:
+        return None
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id FROM Produtos ORDER BY id OFFSET %s ROWS FETCH NEXT 1 ROWS ONLY",
+            ((page - 1) * page_size - 1,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+    return row[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    # TTL zero: mede o banco, não o cache da listagem
+    db = ControlDB.ControlDB(page_cache=TTLCache(ttl=0))
+    seed(db, args.rows)
+
+    last_page = args.rows // args.page_size
+    pages = sorted({p for p in (1, 10, 100, 1_000, 10_000, last_page // 2, last_page) if 1 <= p <= last_page})
+    print(f"{'página':>10} {'offset (ms)':>12} {'cursor (ms)':>12}")
+    for page in pages:
+        after_id = cursor_for_page(db, page, args.page_size)
+        offset_ms = measure(lambda: db.list_products_from_db(page=page, page_size=args.page_size), args.repeat)
+        keyset_ms = measure(lambda: db.list_products_from_db(page_size=args.page_size, after_id=after_id), args.repeat)
+        print(f"{page:>10} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Mede a latência de ControlDB.search_products com e sem os índices de busca
+(IX_Produtos_nome e IX_Produtos_preco de schema.sql).
+
+Usa o SQL Server configurado no .env e, se preciso, completa a tabela
+Produtos até `--rows` linhas; os índices são removidos e recriados durante a
+execução: rode contra um banco descartável.
+
+Uso:
+    python benchmarks/bench_search.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ControlDB
+from TTLCache import TTLCache
+from common import measure, seed
+
+SEARCH_INDEXES = ("IX_Produtos_nome", "IX_Produtos_preco")
+
+# Consultas típicas da tela de busca: (descrição, parâmetros de search_products)
+QUERIES = [
+    ("prefixo do nome", {"name_prefix": "Produto 4242", "sort": "name"}),
+    ("faixa de preço", {"min_price": 100, "max_price": 110, "sort": "price"}),
+    ("ordenado por nome", {"sort": "name"}),
+    ("ordenado por preço", {"sort": "price"}),
+    ("preço, página profunda", {"sort": "price", "after": (900.99, 500_000)}),
+]
+
+
+def drop_search_indexes(db):
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        for name in SEARCH_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name} ON Produtos")
+        conn.commit()
+        cursor.close()
+
+
+def run(db, page_size, repeat):
+    return {
+        label: measure(lambda: db.search_products(page_size=page_size, **params), repeat)
+        for label, params in QUERIES
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    # TTL zero: mede o banco, não o cache da listagem
+    db = ControlDB.ControlDB(page_cache=TTLCache(ttl=0))
+    seed(db, args.rows)
+
+    drop_search_indexes(db)
+    without_indexes = run(db, args.page_size, args.repeat)
+    seed(db, args.rows)  # Recria os índices a partir de schema.sql
+    with_indexes = run(db, args.page_size, args.repeat)
+
+    print(f"{'consulta':<25} {'sem índices (ms)':>17} {'com índices (ms)':>17}")
+    for label, _ in QUERIES:
+        print(f"{label:<25} {without_indexes[label]:>17.2f} {with_indexes[label]:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
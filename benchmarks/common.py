@@ -0,0 +1,45 @@
+"""
+Funções compartilhadas pelos benchmarks.
+"""
+import os
+import statistics
+import time
+
+
+def seed(db, rows):
+    # Cria a tabela (schema.sql) e insere em lote as linhas que faltam
+    with open(os.path.join(os.path.dirname(__file__), '..', 'schema.sql'), encoding='utf-8') as file:
+        schema = file.read()
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(schema)
+        cursor.execute("SELECT COUNT_BIG(*) FROM Produtos")
+        missing = rows - cursor.fetchone()[0]
+        if missing > 0:
+            print(f"Inserindo {missing} produtos...")
+            cursor.execute("""
+                WITH n AS (
+                    SELECT TOP (%s) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS i
+                    FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+                )
+                INSERT INTO Produtos (nome, descricao, preco, imagem_url)
+                SELECT CONCAT('Produto ', i), 'Descrição de teste', (i %% 1000) + 0.99, 'https://example.com/p.webp'
+                FROM n;
+            """, (missing,))
+        conn.commit()
+        cursor.close()
+
+
+def measure(call, repeat):
+    return statistics.median(sample(call, repeat))
+
+
+def sample(call, repeat):
+    # Duração (ms) de cada uma das `repeat` chamadas, depois de uma de aquecimento
+    call()  # Aquecimento (plano em cache, conexão aberta)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
@@ -0,0 +1,351 @@
+"""
+Substitutos locais do SQL Server e do Azure Blob Storage para os benchmarks.
+
+SQLiteDriver tem a interface de conexão do pymssql usada pelo ControlDB e
+traduz o T-SQL das consultas dele para SQLite: parâmetros %s, TOP,
+OFFSET/FETCH, LEFT, COUNT_BIG, a contagem por sys.partitions e o
+DELETE ... OUTPUT (via RETURNING). Não é um tradutor genérico: cobre só o
+que o ControlDB envia.
+
+O Blob Storage é o FakeBlobServer, um servidor HTTP local no estilo do
+Azurite. FakeDriver é um driver em memória com respostas roteirizadas, e
+make_db monta um ControlDB sobre qualquer um dos drivers. Os testes usam os
+mesmos substitutos (tests/fakes.py).
+"""
+import re
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Produtos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    descricao TEXT NOT NULL,
+    preco REAL NOT NULL,
+    imagem_url TEXT NOT NULL,
+    imagem_thumbs TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Produtos_imagem_url ON Produtos (imagem_url);
+CREATE INDEX IF NOT EXISTS IX_Produtos_nome ON Produtos (nome);
+CREATE INDEX IF NOT EXISTS IX_Produtos_preco ON Produtos (preco);
+"""
+
+_TOP = re.compile(r"\bTOP \(\?\)\s*")
+_OFFSET_FETCH = re.compile(r"\bOFFSET (\?|\d+) ROWS FETCH NEXT (\?|\d+) ROWS ONLY", re.IGNORECASE)
+_LEFT = re.compile(r"\bLEFT\((\w+), (\d+)\)")
+_APPROXIMATE_COUNT = re.compile(r"SELECT SUM\(rows\) FROM sys\.partitions .*", re.IGNORECASE)
+_DELETE_OUTPUT = re.compile(r"DELETE FROM Produtos OUTPUT .*? WHERE id IN \(([^)]*)\);")
+
+
+def translate(query, params=()):
+    """
+    Traduz uma consulta T-SQL do ControlDB para SQLite. Retorna (consulta,
+    parâmetros); a ordem dos parâmetros muda quando TOP vira LIMIT.
+    """
+    query = " ".join(query.split()).rstrip(";").replace("%s", "?").replace("%%", "%")
+    params = list(params or ())
+    query = _APPROXIMATE_COUNT.sub("SELECT COUNT(*) FROM Produtos", query)
+    query = query.replace("COUNT_BIG(", "COUNT(")
+    query = _LEFT.sub(r"substr(\1, 1, \2)", query)
+    # OFFSET x ROWS FETCH NEXT n ROWS ONLY -> LIMIT x, n (mesma ordem de parâmetros)
+    query = _OFFSET_FETCH.sub(r"LIMIT \1, \2", query)
+    top = _TOP.search(query)
+    if top:
+        # TOP (n) -> LIMIT n no fim: o parâmetro vai para o fim também
+        index = query[:top.start()].count("?")
+        params.append(params.pop(index))
+        query = query[:top.start()] + query[top.end():] + " LIMIT ?"
+    return query, tuple(params)
+
+
+class SQLiteCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._cursor = conn.connection.cursor()
+        self._rows = None
+
+    def execute(self, query, params=None):
+        self._rows = None
+        delete = _DELETE_OUTPUT.search(" ".join(query.split()))
+        if delete:
+            self._delete_output(delete.group(1).replace("%s", "?"), params)
+            return
+        self._cursor.execute(*translate(query, params))
+
+    def _delete_output(self, placeholders, params):
+        # DELETE ... OUTPUT INTO @removidos + SELECT com a marcação de órfãs
+        removed = self._cursor.execute(
+            f"DELETE FROM Produtos WHERE id IN ({placeholders}) RETURNING imagem_url, imagem_thumbs", tuple(params)
+        ).fetchall()
+        self._rows = [
+            (image_url, thumbnails, 0 if self._cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM Produtos WHERE imagem_url = ?)", (image_url,)
+            ).fetchone()[0] else 1)
+            for image_url, thumbnails in removed
+        ]
+
+    def executemany(self, query, seq):
+        for params in seq:
+            self.execute(query, params)
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path):
+        # O pool entrega a conexão a threads diferentes, uma por vez
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteDriver:
+    """
+    Driver no lugar do pymssql: `connect()` abre conexões ao arquivo SQLite
+    `path`, que já sai com a tabela Produtos e os índices de schema.sql.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def connect(self, **kwargs):
+        return SQLiteConnection(self.path)
+
+    def seed(self, rows):
+        """
+        Completa a tabela até `rows` produtos, com preços de 0.99 a 999.99.
+        """
+        with sqlite3.connect(self.path) as conn:
+            missing = rows - conn.execute("SELECT COUNT(*) FROM Produtos").fetchone()[0]
+            if missing > 0:
+                start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM Produtos").fetchone()[0]
+                conn.executemany(
+                    "INSERT INTO Produtos (nome, descricao, preco, imagem_url) VALUES (?, ?, ?, ?)",
+                    ((f"Produto {i}", "Descrição de teste", (i % 1000) + 0.99, "https://example.com/p.webp")
+                     for i in range(start + 1, start + missing + 1)),
+                )
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise ConnectionError("conexão perdida")
+        self.conn.queries.append((" ".join(query.split()), params))
+        self.rows = list(self.conn.driver.results.pop(0)) if self.conn.driver.results else [(1,)]
+
+    def executemany(self, query, seq):
+        for params in seq:
+            self.execute(query, params)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, driver):
+        self.driver = driver
+        self.broken = False
+        self.closed = False
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.broken:
+            raise ConnectionError("conexão perdida")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDriver:
+    """
+    Driver no lugar do pymssql: `connect()` devolve conexões em memória e
+    `results` enfileira as linhas que as próximas consultas vão retornar.
+    """
+
+    def __init__(self):
+        self.connections = []
+        self.results = []
+        self._lock = threading.Lock()
+
+    def connect(self, **kwargs):
+        conn = FakeConnection(self)
+        with self._lock:
+            self.connections.append(conn)
+        return conn
+
+    @property
+    def queries(self):
+        return [q for conn in self.connections for q in conn.queries]
+
+
+def make_db(blob_server=None, driver=None, container="fotos", page_cache=None):
+    """
+    ControlDB com pool próprio sobre `driver` (um FakeDriver novo, se omitido)
+    e, com `blob_server`, apontado para o FakeBlobServer. O driver e o
+    servidor ficam em `db.driver` e `db.blob_server`.
+    """
+    from ConnectionPool import ConnectionPool
+    from ControlDB import ControlDB
+    driver = driver or FakeDriver()
+    db = ControlDB(pool=ConnectionPool(driver.connect), page_cache=page_cache)
+    db.driver = driver
+    db.blob_server = blob_server
+    if blob_server is not None:
+        db.blob_connection_string = blob_server.connection_string
+        db.blob_container_name = container
+        db.blob_account_name = blob_server.account
+    return db
+
+
+class FakeBlobServer:
+    """
+    Endpoint de Blob Storage em processo (estilo Azurite) com o mínimo de
+    PUT/GET/HEAD/DELETE. A autenticação não é verificada.
+    `connections` conta as conexões TCP aceitas, `requests` as requisições
+    e `uploads` os PUTs.
+    """
+
+    account = "devstoreaccount1"
+    account_key = "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+
+    def __init__(self):
+        from http.server import ThreadingHTTPServer
+        self.blobs = {}
+        self.connections = 0
+        self.requests = 0
+        self.uploads = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/{self.account}"
+
+    @property
+    def connection_string(self):
+        return (
+            f"DefaultEndpointsProtocol=http;AccountName={self.account};"
+            f"AccountKey={self.account_key};BlobEndpoint={self.endpoint};"
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+        from urllib.parse import urlsplit, unquote
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _key(self):
+                path = unquote(urlsplit(self.path).path)
+                return path[len(fake.account) + 2:]
+
+            def _reply(self, status, body=b"", headers=None):
+                with fake._lock:
+                    fake.requests += 1
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", '"0x1"')
+                self.send_header("Last-Modified", "Sat, 01 Jan 2000 00:00:00 GMT")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body and self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _not_found(self):
+                self._reply(404, headers={"x-ms-error-code": "BlobNotFound"})
+
+            def do_PUT(self):
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake._lock:
+                    fake.blobs[self._key()] = data
+                    fake.uploads += 1
+                self._reply(201)
+
+            def do_DELETE(self):
+                with fake._lock:
+                    found = fake.blobs.pop(self._key(), None) is not None
+                self._reply(202) if found else self._not_found()
+
+            def do_HEAD(self):
+                data = fake.blobs.get(self._key())
+                if data is None:
+                    return self._not_found()
+                self._reply(200, data, {"x-ms-blob-type": "BlockBlob"})
+
+            def do_GET(self):
+                data = fake.blobs.get(self._key())
+                if data is None:
+                    return self._not_found()
+                self._reply(200, data, {"x-ms-blob-type": "BlockBlob"})
+
+        return Handler
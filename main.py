@@ -6,5 +6,7 @@ from ProductApp import ProductApp
 if __name__ == "__main__":
     app = ProductApp()
     app.setup_form()
+    app.render_pending_images()
     app.render_product_list()
+    app.render_admin_panel()
 #                     
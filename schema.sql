@@ -0,0 +1,30 @@
+-- Estrutura do banco usada pela aplicação (SQL Server).
+-- Pode ser executado mais de uma vez: só cria o que ainda não existe.
+
+IF OBJECT_ID('Produtos', 'U') IS NULL
+CREATE TABLE Produtos (
+    id INT IDENTITY(1, 1) PRIMARY KEY,  -- Índice clusterizado usado pela paginação por cursor
+    nome NVARCHAR(255) NOT NULL,
+    descricao NVARCHAR(MAX) NOT NULL,
+    preco DECIMAL(10, 2) NOT NULL,
+    imagem_url NVARCHAR(1000) NOT NULL
+);
+
+-- URLs das versões da imagem (miniaturas), em JSON: {"64": "https://...", ...}
+IF COL_LENGTH('Produtos', 'imagem_thumbs') IS NULL
+ALTER TABLE Produtos ADD imagem_thumbs NVARCHAR(MAX) NULL;
+
+-- Imagens são compartilhadas entre produtos (nome do blob = hash do conteúdo);
+-- este índice torna barata a verificação de referências antes de apagar um blob.
+-- URLs ficam bem abaixo do limite de 1700 bytes de chave de índice.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Produtos_imagem_url')
+CREATE INDEX IX_Produtos_imagem_url ON Produtos (imagem_url);
+
+-- Índices da busca (ControlDB.search_products). O id (chave clusterizada) já faz
+-- parte da chave de cada índice, então "ORDER BY nome, id" e "ORDER BY preco, id"
+-- e o prefixo "nome LIKE 'abc%'" são resolvidos com seek, sem ordenar a tabela.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Produtos_nome')
+CREATE INDEX IX_Produtos_nome ON Produtos (nome);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Produtos_preco')
+CREATE INDEX IX_Produtos_preco ON Produtos (preco);
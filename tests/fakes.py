@@ -0,0 +1,10 @@
+"""
+Substitutos locais (sem rede) usados pelos testes. Ficam em
+benchmarks/standins.py, compartilhados com a suíte de benchmarks.
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from standins import FakeBlobServer, FakeConnection, FakeCursor, FakeDriver, make_db  # noqa: E402,F401
@@ -0,0 +1,96 @@
+import sys
+import os
+import asyncio
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import BlobClient
+from AsyncControlDB import AsyncControlDB, save_products
+from fakes import FakeBlobServer, FakeCursor, make_db
+
+
+@pytest.fixture
+def db():
+    BlobClient.reset_clients()
+    with FakeBlobServer() as server:
+        yield make_db(server)
+    BlobClient.reset_clients()
+
+
+def test_salva_produtos_concorrentemente(db):
+    products = [
+        {"name": f"Produto {i}", "price": 10.0 + i, "description": "Descrição", "image": f"imagem {i}".encode(), "image_name": "foto.webp"}
+        for i in range(20)
+    ]
+    assert save_products(products, concurrency=8, db=db) == [True] * 20
+
+    inserts = [params for query, params in db.driver.queries if query.startswith("INSERT")]
+    assert len(inserts) == 20
+    assert len(db.blob_server.blobs) == 20
+    # A URL gravada no banco é a do blob enviado
+    assert {params[3].rsplit("/", 1)[1] for params in inserts} == {key.split("/", 1)[1] for key in db.blob_server.blobs}
+    assert sum(conn.commits for conn in db.driver.connections) == 20
+
+
+def test_conteudo_repetido_envia_um_blob(db):
+    products = [{"name": f"Produto {i}", "price": 10.0, "description": "Descrição", "image": b"mesma imagem"} for i in range(5)]
+    assert save_products(products, db=db) == [True] * 5
+    assert len(db.blob_server.blobs) == 1
+    assert db.blob_server.uploads == 1
+
+
+def test_falha_no_upload_nao_grava_o_produto(db):
+    async def run():
+        async with AsyncControlDB(db) as async_db:
+            async def fail(blobs):
+                raise ConnectionError("falha no upload")
+            async_db._put_blobs = fail
+            return await async_db.save_product_to_db("Produto", 10.0, "Descrição", b"imagem")
+
+    assert asyncio.run(run()) is False
+    assert not db.driver.queries
+    assert db.pool.stats()["in_use"] == 0
+
+
+def test_uploads_concorrentes_alem_do_tamanho_do_pool(db):
+    db.pool.max_size = 2
+    in_flight = peak = 0
+
+    async def run():
+        async with AsyncControlDB(db, concurrency=16) as async_db:
+            async def slow_put(blobs):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.05)
+                in_flight -= 1
+            async_db._put_blobs = slow_put
+            products = [{"name": f"P{i}", "price": 1.0, "description": "d", "image": f"{i}".encode()} for i in range(32)]
+            return await async_db.save_many(products)
+
+    assert asyncio.run(run()) == [True] * 32
+    # Os uploads não esperam conexão: o limite é `concurrency`, não o pool
+    assert peak == 16
+    assert db.pool.stats()["size"] <= 2
+
+
+def test_atualizacoes_sem_imagem_respeitam_o_pool(db, monkeypatch):
+    db.pool.max_size = 1
+    db.pool.timeout = 0.5
+    execute = FakeCursor.execute
+
+    def slow_execute(cursor, query, params=None):
+        time.sleep(0.1)
+        execute(cursor, query, params)
+
+    monkeypatch.setattr(FakeCursor, "execute", slow_execute)
+
+    async def run():
+        async with AsyncControlDB(db, concurrency=10) as async_db:
+            return await asyncio.gather(*(async_db.update_product_in_db(i, "Nome", 1.0, "d") for i in range(10)))
+
+    # Sem esperar por vaga, as threads disputariam a única conexão até o PoolTimeout
+    assert asyncio.run(run()) == [True] * 10
+    assert db.pool.stats()["timeouts"] == 0
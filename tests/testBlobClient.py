@@ -0,0 +1,122 @@
+import sys
+import os
+import json
+import hashlib
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import BlobClient
+import BlobDeleteQueue
+from fakes import FakeBlobServer, FakeCursor, make_db
+
+
+@pytest.fixture
+def blob_server(monkeypatch):
+    # Exclusões sem a espera de segurança entre processos
+    monkeypatch.setenv("BLOB_DELETE_DELAY", "0")
+    BlobClient.reset_clients()
+    with FakeBlobServer() as server:
+        yield server
+    BlobClient.reset_clients()
+
+
+def test_cliente_compartilhado_entre_instancias(blob_server):
+    assert make_db(blob_server).container_client is make_db(blob_server).container_client
+
+
+def test_uploads_reaproveitam_a_conexao_http(blob_server, tmp_path):
+    for i in range(5):
+        image = tmp_path / f"foto{i}.webp"
+        image.write_bytes(b"conteudo %d" % i)
+        assert make_db(blob_server).upload_blob(str(image))
+    assert len(blob_server.blobs) == 5
+    assert blob_server.connections == 1
+
+
+def test_exclusao_usa_o_cliente_compartilhado(blob_server, tmp_path):
+    image = tmp_path / "foto.webp"
+    image.write_bytes(b"conteudo")
+    db = make_db(blob_server)
+    driver = db.driver
+    url = db.upload_blob(str(image))
+    driver.results = [[(url, None, 1)], [(0,)]]
+    assert db.delete_product_from_db(1)
+    assert BlobDeleteQueue.get_delete_queue(db.blob_connection_string, "fotos").wait_idle(5)
+    assert blob_server.blobs == {}
+    assert blob_server.connections == 1
+
+
+def test_upload_direto_da_memoria(blob_server):
+    db = make_db(blob_server)
+    url = db.upload_blob(memoryview(b"webp em memoria"), "foto.webp")
+    assert url.endswith("/" + hashlib.sha256(b"webp em memoria").hexdigest() + ".webp")
+    assert list(blob_server.blobs.values()) == [b"webp em memoria"]
+
+
+def test_upload_das_versoes_da_imagem(blob_server):
+    db = make_db(blob_server)
+    image_url, thumbnails = db.upload_image({64: b"p", 300: b"g"}, "foto.webp")
+    assert image_url.endswith("_300.webp")
+    assert sorted(json.loads(thumbnails)) == ["300", "64"]
+    assert sorted(blob_server.blobs.values()) == [b"g", b"p"]
+
+
+def test_conteudo_repetido_nao_e_enviado_de_novo(blob_server):
+    urls = {make_db(blob_server).upload_blob(b"mesma imagem", f"{i}.webp") for i in range(3)}
+    assert len(urls) == 1
+    assert len(blob_server.blobs) == 1
+    # Conteúdo já enviado: só a consulta de existência
+    requests_before = blob_server.requests
+    make_db(blob_server).upload_blob(b"mesma imagem", "outra.webp")
+    assert blob_server.requests == requests_before + 1
+
+
+def test_blob_apagado_por_outro_processo_e_enviado_de_novo(blob_server):
+    db = make_db(blob_server)
+    db.upload_blob(b"imagem")
+    blob_server.blobs.clear()  # Outro processo apagou o blob
+    db.upload_blob(b"imagem")
+    assert list(blob_server.blobs.values()) == [b"imagem"]
+
+
+def test_blob_compartilhado_nao_e_apagado(blob_server):
+    db = make_db(blob_server)
+    driver = db.driver
+    url = db.upload_blob(b"imagem compartilhada")
+    # DELETE ... OUTPUT: outro produto ainda usa a imagem
+    driver.results = [[(url, None, 0)]]
+    assert db.delete_product_from_db(1)
+    assert len(blob_server.blobs) == 1
+
+    # Última referência: o blob é apagado em segundo plano
+    driver.results = [[(url, None, 1)], [(0,)]]
+    assert db.delete_product_from_db(2)
+    assert BlobDeleteQueue.get_delete_queue(db.blob_connection_string, "fotos").wait_idle(5)
+    assert blob_server.blobs == {}
+
+
+def test_exclusao_pendente_nao_apaga_blob_reaproveitado(blob_server, monkeypatch):
+    db = make_db(blob_server)
+    driver = db.driver
+    delete_queue = BlobDeleteQueue.BlobDeleteQueue(db.container_client, delay=0.2)
+    monkeypatch.setitem(BlobDeleteQueue._queues, (db.blob_connection_string, "fotos"), delete_queue)
+    url = db.upload_blob(b"imagem")
+    # O produto é apagado: a exclusão do blob fica pendente na fila
+    driver.results = [[(url, None, 1)]]
+    assert db.delete_product_from_db(1)
+
+    # Outro produto reaproveita o blob, e a fila roda antes do commit dele,
+    # quando o banco ainda não mostra nenhuma referência
+    execute = FakeCursor.execute
+
+    def execute_after_queue(cursor, query, params=None):
+        if query.startswith("INSERT"):
+            assert delete_queue.wait_idle(5)
+        execute(cursor, query, params)
+
+    monkeypatch.setattr(FakeCursor, "execute", execute_after_queue)
+    driver.results = [[(0,)]]
+    assert db.save_product_to_db("Produto", 10.0, "Descrição", b"imagem")
+    assert list(blob_server.blobs.values()) == [b"imagem"]
+    assert delete_queue.stats()["skipped"] == 1
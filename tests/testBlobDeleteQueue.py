@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+from azure.core.exceptions import ResourceNotFoundError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BlobDeleteQueue import BlobDeleteQueue
+
+
+class FlakyContainer:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.deleted = []
+
+    def delete_blob(self, name):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("falha temporária")
+        if name == "inexistente":
+            raise ResourceNotFoundError("BlobNotFound")
+        self.deleted.append(name)
+
+
+def test_repete_ate_conseguir():
+    container = FlakyContainer(failures=2)
+    delete_queue = BlobDeleteQueue(container, base_delay=0.01)
+    delete_queue.put(["a.webp", "inexistente"])
+    assert delete_queue.wait_idle(5)
+    assert container.deleted == ["a.webp"]
+    assert delete_queue.stats()["retries"] == 2
+
+
+def test_desiste_apos_max_tentativas():
+    delete_queue = BlobDeleteQueue(FlakyContainer(failures=10), max_attempts=2, base_delay=0.01)
+    delete_queue.put(["a.webp"])
+    assert delete_queue.wait_idle(5)
+    assert delete_queue.stats()["failed"] == 1
+
+
+def test_nao_apaga_imagem_que_voltou_a_ser_usada():
+    container = FlakyContainer()
+    delete_queue = BlobDeleteQueue(container)
+    delete_queue.put(["a.webp"], still_used=lambda: True)
+    assert delete_queue.wait_idle(5)
+    assert container.deleted == [] and delete_queue.stats()["skipped"] == 1
+
+
+def test_retentativa_vencida_nao_espera_a_fila_esvaziar():
+    class SlowContainer(FlakyContainer):
+        def delete_blob(self, name):
+            time.sleep(0.005)
+            super().delete_blob(name)
+
+    container = SlowContainer(failures=1)
+    delete_queue = BlobDeleteQueue(container, base_delay=0.01)
+    delete_queue.put(["a.webp"])
+    # Itens novos chegando sem parar enquanto a retentativa de a.webp vence
+    for i in range(100):
+        delete_queue.put([f"{i}.webp"])
+        time.sleep(0.002)
+    assert delete_queue.wait_idle(5)
+    assert container.deleted.index("a.webp") < 50
+
+
+def test_blob_reservado_nao_e_apagado():
+    container = FlakyContainer()
+    delete_queue = BlobDeleteQueue(container)
+    delete_queue.hold(["a.webp"])
+    delete_queue.put(["a.webp"])
+    assert delete_queue.wait_idle(5)
+    assert container.deleted == [] and delete_queue.stats()["skipped"] == 1
+
+    delete_queue.release(["a.webp"])
+    delete_queue.put(["a.webp"])
+    assert delete_queue.wait_idle(5)
+    assert container.deleted == ["a.webp"]
+
+
+def test_exclusao_espera_o_atraso():
+    container = FlakyContainer()
+    delete_queue = BlobDeleteQueue(container, delay=0.1)
+    start = time.monotonic()
+    delete_queue.put(["a.webp"])
+    assert delete_queue.wait_idle(5)
+    assert time.monotonic() - start >= 0.1 and container.deleted == ["a.webp"]
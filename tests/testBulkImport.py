@@ -0,0 +1,66 @@
+import sys
+import os
+import json
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import BlobClient
+import BulkImport
+from fakes import FakeBlobServer, make_db
+
+
+@pytest.fixture
+def db():
+    BlobClient.reset_clients()
+    with FakeBlobServer() as server:
+        yield make_db(server)
+    BlobClient.reset_clients()
+
+
+def inserts(db):
+    return [q for q in db.driver.queries if q[0].startswith("INSERT")]
+
+
+def test_insere_em_lotes_com_uma_transacao_por_lote(db, tmp_path):
+    image = tmp_path / "foto.webp"
+    image.write_bytes(b"conteudo")
+    products = [{"name": f"P{i}", "price": 1.0, "description": "d", "image": str(image)} for i in range(7)]
+    stats = db.bulk_save_products(products, batch_size=3, max_workers=2)
+    assert stats["saved"] == 7 and stats["batches"] == 3 and stats["uploads"] == 7
+    assert len(inserts(db)) == 3
+    # A mesma imagem é enviada uma única vez
+    assert len(db.blob_server.blobs) == 1
+    conn = db.driver.connections[0]
+    assert conn.commits == 3
+
+
+def test_uploads_simultaneos_da_mesma_imagem_viram_um_so(db):
+    products = [{"name": f"P{i}", "price": 1.0, "description": "d", "image": b"mesma imagem"} for i in range(20)]
+    assert db.bulk_save_products(products, max_workers=8)["saved"] == 20
+    assert db.blob_server.uploads == 1
+
+
+def test_produto_sem_imagem_e_reportado(db):
+    failed = []
+    stats = db.bulk_save_products(
+        [{"name": "A", "price": 1.0, "description": "d", "image_url": "http://x/a.webp"},
+         {"name": "B", "price": 1.0, "description": "d"}],
+        on_error=failed.append,
+    )
+    assert stats["saved"] == 1 and stats["failed"] == 1
+    assert failed[0]["name"] == "B"
+    assert inserts(db)[0][1] == ("A", "d", 1.0, "http://x/a.webp")
+
+
+def test_cli_retoma_a_partir_do_checkpoint(db, tmp_path):
+    source = tmp_path / "produtos.jsonl"
+    source.write_text("\n".join(
+        json.dumps({"name": f"P{i}", "price": "2.5", "description": "d", "image_url": f"http://x/{i}.webp"})
+        for i in range(5)
+    ))
+    BulkImport.save_checkpoint(f"{source}.checkpoint", 3)
+    stats = BulkImport.import_products(db, str(source), batch_size=2)
+    assert stats["saved"] == 2
+    assert [row[1][0] for row in inserts(db)] == ["P3"]
+    assert BulkImport.load_checkpoint(f"{source}.checkpoint") == 5
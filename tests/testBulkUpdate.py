@@ -0,0 +1,69 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import BulkUpdate
+from fakes import make_db
+
+
+def test_alteracoes_em_uma_transacao_com_tabela_temporaria():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[], [], [(2,)]]
+    changes = [{"id": 1, "price": 10.0}, {"id": 2, "name": "Novo"}, {"id": 1, "name": "Outro", "price": 12.0}, {"id": 1, "description": "Texto", "price": None}]
+    assert db.update_products(changes) == 2
+
+    create, insert, update = driver.queries
+    assert "CREATE TABLE #alteracoes" in create[0]
+    # O id repetido vale uma vez, com os campos combinados (o último valor vence)
+    assert insert[1] == (1, "Outro", "Texto", 12.0, 2, "Novo", None, None)
+    assert "FROM #alteracoes" in update[0] and "COALESCE(a.preco, Produtos.preco)" in update[0]
+    assert [conn.commits for conn in driver.connections] == [1]
+
+
+def test_reajuste_por_conjunto_com_filtros_e_lotes_de_ids():
+    db = make_db()
+    driver = db.driver
+    db.UPDATE_IDS_PER_STATEMENT = 2
+    driver.results = [[(2,)], [(1,)]]
+    assert db.reprice_products(5, ids=[1, 2, 3], name_prefix="Cami") == 3
+
+    (first, params), (second, _) = driver.queries
+    assert "SET preco = ROUND(preco * (100 + %s) / 100, 2)" in first
+    assert "nome LIKE %s" in first and "id IN (%s, %s)" in first
+    assert params == (5, "Cami%", 1, 2)
+    assert "id IN (%s)" in second
+    assert [conn.commits for conn in driver.connections] == [1]
+
+
+def test_reajuste_sem_filtros_vale_para_todos():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[(7,)]]
+    assert db.reprice_products(-10) == 7
+    assert "WHERE" not in driver.queries[0][0]
+    with pytest.raises(ValueError):
+        db.reprice_products(-100)
+
+
+def test_erro_desfaz_a_transacao():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[], [], []]  # UPDATE sem a contagem: falha antes do commit
+    assert db.update_products([{"id": 1, "price": 1.0}]) is None
+    assert driver.connections[0].commits == 0 and driver.connections[0].rollbacks == 1
+
+
+def test_le_alteracoes_ignorando_campos_vazios(tmp_path):
+    path = tmp_path / "alteracoes.csv"
+    path.write_text("id,name,description,price\n1,,,19.90\n2,Novo nome,,\n", encoding="utf-8")
+    assert BulkUpdate.read_changes(str(path)) == [{"id": 1, "price": 19.9}, {"id": 2, "name": "Novo nome"}]
+
+
+def test_cli_recusa_reajuste_de_menos_100_por_cento(capsys):
+    with pytest.raises(SystemExit) as exit:
+        BulkUpdate.main(["reajustar", "--percent", "-100", "--all"])
+    assert exit.value.code == 2
+    assert "--percent deve ser maior que -100" in capsys.readouterr().err
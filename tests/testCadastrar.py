@@ -50,13 +50,19 @@ def cadastrar_produtos_teste(db):
         print("Erro ao baixar a imagem. Cadastro abortado.")
         return
 
-    for i in range(20):
-        nome = f"{random.choice(nomes)} {i+1}"
-        descricao = random.choice(descricoes)
-        preco = random.uniform(10.0, 200.0)
-        db.save_product_to_db(name=nome, price=preco, description=descricao, image=imagem_local)
+    produtos = [
+        {
+            "name": f"{random.choice(nomes)} {i+1}",
+            "description": random.choice(descricoes),
+            "price": random.uniform(10.0, 200.0),
+            "image": imagem_local,
+        }
+        for i in range(20)
+    ]
+    # Uploads em paralelo e um único INSERT em lote
+    stats = db.bulk_save_products(produtos)
 
-    print("20 produtos cadastrados com sucesso.")
+    print(f"{stats['saved']} produtos cadastrados com sucesso.")
 
 if __name__ == "__main__":
     # Inicializa o banco de dados
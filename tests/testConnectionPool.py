@@ -0,0 +1,86 @@
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ConnectionPool import ConnectionPool, PoolTimeout
+from fakes import FakeDriver, make_db
+
+
+def test_reaproveita_conexao_entre_emprestimos():
+    driver = FakeDriver()
+    pool = ConnectionPool(driver.connect, max_size=2)
+    for _ in range(5):
+        with pool.connection() as conn:
+            conn.cursor().execute("SELECT 1")
+    assert len(driver.connections) == 1
+    assert pool.stats()["checkouts"] == 5
+
+
+def test_limite_de_conexoes_e_espera():
+    driver = FakeDriver()
+    pool = ConnectionPool(driver.connect, max_size=1, timeout=2)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(conn,)).start()
+    with pool.connection() as other:
+        assert other is conn
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["wait_time"] > 0
+    assert stats["created"] == 1
+
+
+def test_timeout_quando_pool_esgotado():
+    pool = ConnectionPool(FakeDriver().connect, max_size=1, timeout=0.01)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_remove_conexoes_ociosas():
+    driver = FakeDriver()
+    pool = ConnectionPool(driver.connect, max_size=2, max_idle=0.01)
+    with pool.connection():
+        pass
+    time.sleep(0.02)
+    with pool.connection():
+        pass
+    assert driver.connections[0].closed
+    assert pool.stats()["evicted"] == 1
+    assert len(driver.connections) == 2
+
+
+def test_health_check_descarta_conexao_quebrada():
+    driver = FakeDriver()
+    pool = ConnectionPool(driver.connect, health_check_interval=0)
+    with pool.connection() as conn:
+        pass
+    conn.broken = True
+    with pool.connection() as fresh:
+        assert fresh is not conn
+    assert conn.closed
+    assert pool.stats()["discarded"] == 1
+
+
+def test_erro_faz_rollback_e_devolve_conexao():
+    driver = FakeDriver()
+    pool = ConnectionPool(driver.connect)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError()
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_controldb_usa_o_pool():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[(1, "Produto A", "Descrição", 10.0, "url", None)]] * 3
+    for page in range(1, 4):
+        assert db.list_products_from_db(page=page, page_size=10).products == ((1, "Produto A", "Descrição", 10.0, "url", None),)
+    assert len(driver.connections) == 1
+    assert db.pool_stats()["checkouts"] == 3
@@ -0,0 +1,142 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ControlDB import ControlDB
+from Product import Product
+from fakes import FakeCursor, make_db
+
+
+def test_paginacao_por_cursor_nao_usa_offset():
+    db = make_db()
+    driver = db.driver
+    db.list_products_from_db(page_size=20, after_id=500)
+    query, params = driver.queries[-1]
+    assert "WHERE id > %s" in query and "OFFSET" not in query
+    assert params == (21, 500)
+
+
+def test_paginacao_por_offset():
+    db = make_db()
+    driver = db.driver
+    db.list_products_from_db(page=3, page_size=10)
+    query, params = driver.queries[-1]
+    assert "OFFSET" in query
+    assert params == (20, 11)
+
+
+def test_listagem_retorna_product_com_colunas_explicitas():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[(1, "Produto A", "Descrição", 10.0, "url", None)]]
+    products = db.list_products_from_db().products
+    assert products == (Product(1, "Produto A", "Descrição", 10.0, "url"),)
+    assert products[0].name == "Produto A"
+    query = driver.queries[-1][0]
+    assert "SELECT *" not in query and "LEFT(descricao, 200)" in query
+
+
+def test_descricao_completa_sob_demanda():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[("Descrição completa",)]]
+    assert db.get_product_description(1) == "Descrição completa"
+    assert driver.queries[-1] == ("SELECT descricao FROM Produtos WHERE id = %s", (1,))
+
+
+def test_listagem_usa_cache_ate_uma_escrita():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[(1, "Produto A", "Descrição", 10.0, "url", None)]]
+    first = db.list_products_from_db(page_size=10, after_id=0)
+    assert db.list_products_from_db(page_size=10, after_id=0) == first
+    assert len(driver.queries) == 1
+
+    db.update_product_in_db(1, "Produto B", 12.0, "Descrição")
+    db.list_products_from_db(page_size=10, after_id=0)
+    assert len(driver.queries) == 3
+    assert db.cache_stats()["hits"] == 1 and db.cache_stats()["invalidations"] == 1
+
+
+def test_versoes_da_imagem_e_escolha_da_menor_que_cabe():
+    db = make_db()
+    driver = db.driver
+    thumbs = '{"64": "url64", "150": "url150", "300": "url300"}'
+    driver.results = [[(1, "Produto A", "Descrição", 10.0, "url300", thumbs)]]
+    product = db.list_products_from_db().products[0]
+    assert product.thumbnails == {64: "url64", 150: "url150", 300: "url300"}
+    assert product.image_for(64) == "url64"
+    assert product.image_for(100) == "url150"
+    assert product.image_for(600) == "url300"
+    assert Product(2, "B", "d", 1.0, "principal").image_for(64) == "principal"
+
+
+def test_exclusao_em_lote_em_um_comando():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[("url1", None, 0), ("url2", None, 0)]]
+    assert db.delete_products_from_db([1, 2]) == 2
+    query, params = driver.queries[-1]
+    assert "OUTPUT deleted.imagem_url" in query and "IN (%s, %s)" in query
+    assert params == (1, 2)
+    assert len(driver.queries) == 1
+    assert driver.connections[0].commits == 1
+
+
+def test_busca_por_prefixo_e_preco_com_cursor():
+    db = make_db()
+    driver = db.driver
+    db.search_products(name_prefix="50%_off", min_price=10, max_price=20, sort="price", after=(15, 7), page_size=5)
+    query, params = driver.queries[-1]
+    assert "nome LIKE %s ESCAPE" in query
+    assert "(preco > %s OR (preco = %s AND id > %s))" in query
+    assert "ORDER BY preco, id" in query
+    assert params == (6, "50\\%\\_off%", 10, 20, 15, 15, 7)
+
+
+def test_cursor_da_busca():
+    product = Product(7, "Nome", "d", 15, "url")
+    assert ControlDB.search_cursor(product, "price") == (15, 7)
+    assert ControlDB.search_cursor(product, "name") == ("Nome", 7)
+    assert ControlDB.search_cursor(product) == (7,)
+
+
+def test_linha_extra_indica_proxima_pagina():
+    db = make_db()
+    driver = db.driver
+    rows = [(i, f"P{i}", "d", 1.0, "url", None) for i in range(1, 4)]
+    driver.results = [rows, rows[:2]]
+    page = db.list_products_from_db(page_size=2, after_id=0)
+    assert len(page.products) == 2 and page.has_next
+    page = db.list_products_from_db(page_size=2, after_id=1)
+    assert len(page.products) == 2 and not page.has_next
+
+
+def test_total_aproximado_em_cache():
+    db = make_db()
+    driver = db.driver
+    driver.results = [[(1234,)]]
+    assert db.count_products() == 1234
+    assert db.count_products() == 1234
+    assert len(driver.queries) == 1 and "sys.partitions" in driver.queries[0][0]
+
+
+def test_banco_sem_imagem_thumbs_lista_e_avisa(monkeypatch):
+    db = make_db()
+    driver = db.driver
+    execute = FakeCursor.execute
+
+    def old_schema(cursor, query, params=None):
+        if "imagem_thumbs" in query and "NULL AS imagem_thumbs" not in query and "COL_LENGTH" not in query:
+            raise Exception("Invalid column name 'imagem_thumbs'.")
+        execute(cursor, query, params)
+
+    monkeypatch.setattr(FakeCursor, "execute", old_schema)
+    row = (1, "Produto", "Descrição", 10.0, "url", None)
+    driver.results = [[(None,)], [row], [row]]
+    assert db.list_products_from_db(page_size=10, after_id=0).products == (Product(*row),)
+    assert db.schema_outdated()
+    # Depois de detectado, as consultas já saem sem a coluna
+    assert db.search_products(name_prefix="Pro").products == (Product(*row),)
+    assert not make_db().schema_outdated()
@@ -0,0 +1,51 @@
+import sys
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ImageProcessor as ImageProcessorModule
+from ImageProcessor import ImageProcessor, ImageTooLarge
+
+
+def image_file(size=(800, 600), format="PNG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, "blue").save(buffer, format=format)
+    buffer.seek(0)
+    return buffer
+
+
+def test_gera_todas_as_versoes():
+    renditions = ImageProcessor(image_file()).renditions(((64, 60), (150, 70), (300, 80)))
+    assert sorted(renditions) == [64, 150, 300]
+    for size, data in renditions.items():
+        with Image.open(BytesIO(data)) as img:
+            assert img.size == (size, size) and img.format == "WEBP"
+
+
+def test_versoes_nao_alteram_a_imagem():
+    processor = ImageProcessor(image_file())
+    processor.renditions()
+    assert processor.image.size == (800, 600)
+
+
+def test_jpeg_decodificado_em_escala_reduzida():
+    processor = ImageProcessor(image_file((4000, 3000), "JPEG"), max_size=(300, 300))
+    # draft reduz por 1/8 mantendo pelo menos 300x300
+    assert processor.image.size == (500, 375) and processor.image.mode == "RGB"
+    with Image.open(BytesIO(processor.renditions()[300])) as img:
+        assert img.size == (300, 300)
+
+
+def test_limites_de_pixels_e_bytes(monkeypatch):
+    monkeypatch.setattr(ImageProcessorModule, "MAX_IMAGE_PIXELS", 1_000_000)
+    with pytest.raises(ImageTooLarge):
+        ImageProcessor(image_file((2000, 1000)))
+    # O JPEG do mesmo tamanho passa: só a versão reduzida é decodificada
+    ImageProcessor(image_file((2000, 1000), "JPEG"), max_size=(300, 300))
+
+    monkeypatch.setattr(ImageProcessorModule, "MAX_IMAGE_BYTES", 100)
+    with pytest.raises(ImageTooLarge):
+        ImageProcessor(image_file())
@@ -0,0 +1,38 @@
+import sys
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ImageService import ImageService, ImageServiceBusy
+
+
+def image_bytes(size=(640, 480)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def service():
+    service = ImageService(max_workers=2, max_pending=2, submit_timeout=0)
+    yield service
+    service.shutdown()
+
+
+def test_processa_em_outro_processo(service):
+    future = service.submit(image_bytes(), 300, 300)
+    with Image.open(BytesIO(future.result(timeout=30))) as img:
+        assert img.size == (300, 300) and img.format == "WEBP"
+
+
+def test_fila_cheia_levanta_busy(service):
+    futures = [service.submit(image_bytes(), 300, 300) for i in range(2)]
+    with pytest.raises(ImageServiceBusy):
+        service.submit(image_bytes(), 300, 300)
+    for future in futures:
+        future.result(timeout=30)
+    # As vagas voltam assim que as imagens terminam
+    service.submit(image_bytes(), 300, 300, timeout=5).result(timeout=30)
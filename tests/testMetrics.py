@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+from io import BytesIO
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import Metrics
+from ImageService import ImageService
+from Metrics import Registry
+from fakes import make_db
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    Metrics.REGISTRY.reset()
+    yield
+    Metrics.REGISTRY.reset()
+
+
+def test_histograma_erros_e_bytes():
+    registry = Registry(buckets=(0.01, 0.1))
+    registry.observe("op", 0.005)
+    registry.observe("op", 0.05)
+    registry.observe("op", 5)
+    registry.add_bytes("op", 100)
+    with pytest.raises(ValueError):
+        with registry.timer("op"):
+            raise ValueError()
+
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"]["op"]["counts"][1:] == [1, 1]
+    assert sum(snapshot["histograms"]["op"]["counts"]) == 4
+    assert snapshot["errors"] == {"op": 1}
+    [row] = registry.summary()
+    assert row["count"] == 4 and row["bytes"] == 100 and row["p50_ms"] == 10
+
+
+def test_exporta_prometheus_e_json(tmp_path):
+    registry = Registry(buckets=(0.01, 0.1))
+    registry.observe("db.save_product", 0.05)
+    registry.error("db.save_product")
+    text = registry.to_prometheus()
+    assert 'dio_operation_seconds_bucket{operation="db.save_product",le="0.01"} 0' in text
+    assert 'dio_operation_seconds_bucket{operation="db.save_product",le="+Inf"} 1' in text
+    assert 'dio_operation_errors_total{operation="db.save_product"} 1' in text
+
+    registry.write(str(tmp_path / "metrics.json"))
+    copy = Registry(buckets=(0.01, 0.1))
+    copy.merge(json.loads((tmp_path / "metrics.json").read_text()))
+    assert copy.to_prometheus() == text
+
+
+def test_controldb_registra_latencia_e_erros():
+    db = make_db()
+    driver = db.driver
+    db.list_products_from_db(page_size=10, after_id=0)
+    driver.connect = None  # Próxima conexão falha
+    db.pool.close()
+    db.count_products()
+
+    rows = {row["operation"]: row for row in Metrics.REGISTRY.summary()}
+    assert rows["db.list_products"]["count"] == 1
+    assert rows["db.count_products"]["errors"] == 1
+
+
+def test_metricas_dos_workers_de_imagem_chegam_ao_processo_principal():
+    buffer = BytesIO()
+    Image.new("RGB", (640, 480), "red").save(buffer, format="PNG")
+    service = ImageService(max_workers=1)
+    try:
+        service.submit_renditions(buffer.getvalue()).result(timeout=30)
+    finally:
+        service.shutdown()
+
+    rows = {row["operation"]: row for row in Metrics.REGISTRY.summary()}
+    assert rows["image.open"]["count"] == 1
+    assert rows["image.resize"]["count"] == 3
+    assert rows["image.encode"]["count"] == 3 and rows["image.encode"]["bytes"] > 0
+    assert rows["image.job"]["count"] == 1
@@ -0,0 +1,66 @@
+import sys
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import BlobClient
+import Placeholder
+from ControlDB import ControlDB
+from fakes import FakeBlobServer, make_db
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLACEHOLDER_CACHE_DIR", str(tmp_path))
+    BlobClient.reset_clients()
+    Placeholder._memo.clear()
+    with FakeBlobServer() as server:
+        source = BytesIO()
+        Image.new("RGB", (500, 500), "gray").save(source, format="PNG")
+        server.blobs["origem/placeholder.png"] = source.getvalue()
+        server.source_url = f"{server.endpoint}/origem/placeholder.png"
+        yield server
+    BlobClient.reset_clients()
+
+
+def test_processa_e_envia_uma_unica_vez(server):
+    image_url, thumbnails = Placeholder.get_placeholder(make_db(server), server.source_url)
+    assert image_url.split("/")[-1].startswith(ControlDB.PROTECTED_BLOB_PREFIX)
+    requests_before = server.requests
+
+    assert Placeholder.get_placeholder(make_db(server), server.source_url) == (image_url, thumbnails)
+    # Novo processo: memória vazia, mas o cache em disco evita download e upload
+    Placeholder._memo.clear()
+    assert Placeholder.get_placeholder(make_db(server), server.source_url) == (image_url, thumbnails)
+    assert server.requests == requests_before
+
+
+def test_refresh_baixa_de_novo(server):
+    Placeholder.get_placeholder(make_db(server), server.source_url)
+    requests_before = server.requests
+    Placeholder.refresh(server.source_url)
+    Placeholder.get_placeholder(make_db(server), server.source_url)
+    assert server.requests > requests_before
+
+
+def test_placeholder_nao_e_apagado_com_o_produto(server):
+    db = make_db(server)
+    driver = db.driver
+    image_url, thumbnails = Placeholder.get_placeholder(db, server.source_url)
+    blobs = len(server.blobs)
+    driver.results = [[(image_url, thumbnails, 1)]]
+    assert db.delete_product_from_db(1)
+    assert len(server.blobs) == blobs
+
+
+def test_cache_em_disco_e_gravado_por_renomeacao(server, tmp_path, monkeypatch):
+    replaced = []
+    replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: replaced.append(os.path.basename(dst)) or replace(src, dst))
+    Placeholder.get_placeholder(make_db(server), server.source_url)
+    # Cada versão e o índice aparecem já completos, e nenhum temporário fica para trás
+    assert sorted(replaced) == sorted(os.listdir(tmp_path))
+    assert len(replaced) == len(Placeholder.ImageProcessor.RENDITIONS) + 1
@@ -0,0 +1,48 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import BlobClient
+from TTLCache import TTLCache
+from standins import FakeBlobServer, SQLiteDriver, make_db, translate
+
+
+@pytest.fixture
+def db(tmp_path):
+    BlobClient.reset_clients()
+    with FakeBlobServer() as server:
+        driver = SQLiteDriver(str(tmp_path / "bench.db"))
+        driver.seed(50)
+        db = make_db(server, driver, page_cache=TTLCache(ttl=0))
+        yield db
+        db.pool.close()
+    BlobClient.reset_clients()
+
+
+def test_traduz_top_para_limit_no_fim():
+    query, params = translate("SELECT TOP (%s) id FROM Produtos WHERE id > %s ORDER BY id;", (11, 5))
+    assert query == "SELECT id FROM Produtos WHERE id > ? ORDER BY id LIMIT ?"
+    assert params == (5, 11)
+
+
+def test_listagem_e_busca_do_controldb_no_sqlite(db):
+    by_offset = db.list_products_from_db(page=2, page_size=10)
+    by_cursor = db.list_products_from_db(page_size=10, after_id=10)
+    assert by_offset == by_cursor
+    assert [p.id for p in by_cursor.products] == list(range(11, 21)) and by_cursor.has_next
+
+    page = db.search_products(name_prefix="Produto 4", sort="name", page_size=5)
+    assert [p.name for p in page.products] == ["Produto 4", "Produto 40", "Produto 41", "Produto 42", "Produto 43"]
+    page = db.search_products(name_prefix="Produto 4", sort="name", after=db.search_cursor(page.products[-1], "name"), page_size=5)
+    assert [p.name for p in page.products] == ["Produto 44", "Produto 45", "Produto 46", "Produto 47", "Produto 48"]
+    assert db.count_products() == 50
+
+
+def test_exclusao_marca_imagens_orfas(db):
+    assert db.save_product_to_db("Novo", 5.0, "Descrição", image_urls=("https://example.com/nova.webp", None))
+    new_id = db.list_products_from_db(page_size=10, after_id=50).products[0].id
+    assert db.delete_products_from_db([1, new_id]) == 2
+    assert db.count_products(approximate=False) == 49
@@ -0,0 +1,35 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from TTLCache import TTLCache
+
+
+def test_expira_apos_ttl():
+    cache = TTLCache(ttl=0.01)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_remove_o_menos_usado():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_valor_lido_antes_da_invalidacao_e_ignorado():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("a", "velho", generation)
+    assert cache.get("a") is None